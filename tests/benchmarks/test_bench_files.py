@@ -0,0 +1,56 @@
+import asyncio
+import os
+
+import pytest
+
+from yast.responses import FileResponse
+
+
+class MmapFileResponse(FileResponse):
+    use_mmap = True
+
+
+MODES = {
+    "chunks": (FileResponse, {}),
+    "mmap": (MmapFileResponse, {}),
+    "zerocopysend": (FileResponse, {"http.response.zerocopysend": {}}),
+}
+
+
+@pytest.fixture(scope="module")
+def large_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp("bench") / "artifact.bin"
+    with open(path, "wb") as file:
+        file.write(os.urandom(16 * 1024 * 1024))
+    yield str(path)
+    path.unlink()
+
+
+@pytest.mark.parametrize("mode", list(MODES))
+@pytest.mark.benchmark(group="file-response", max_time=0.5)
+def test_file_response_modes(benchmark, large_file, mode):
+    response_class, extensions = MODES[mode]
+    scope = {"type": "http", "method": "GET", "extensions": extensions}
+    loop = asyncio.new_event_loop()
+    sink = os.open(os.devnull, os.O_WRONLY)
+
+    async def send(message):
+        # a server writing the body to a socket, sendfile for zero copy
+        if message["type"] == "http.response.zerocopysend":
+            file = message["file"]
+            offset, count = message["offset"], message["count"]
+            while count > 0:
+                sent = os.sendfile(sink, file.fileno(), offset, count)
+                offset, count = offset + sent, count - sent
+        elif message["type"] == "http.response.body":
+            os.write(sink, message.get("body", b""))
+
+    def serve():
+        response = response_class(large_file).for_scope(scope)
+        loop.run_until_complete(response(None, send))
+
+    try:
+        benchmark(serve)
+    finally:
+        os.close(sink)
+        loop.close()
@@ -0,0 +1,48 @@
+import pytest
+
+from yast.datastructures import Headers
+
+RAW = [
+    (b"host", b"example.org"),
+    (b"user-agent", b"Mozilla/5.0 (X11; Linux x86_64)"),
+    (b"accept", b"text/html,application/xhtml+xml"),
+    (b"accept-encoding", b"gzip, deflate, br"),
+    (b"accept-language", b"en-US,en;q=0.5"),
+    (b"cookie", b"session=abc; theme=dark"),
+    (b"x-forwarded-for", b"10.0.0.1"),
+    (b"x-request-id", b"5f0c6d1e"),
+    (b"connection", b"keep-alive"),
+    (b"content-type", b"application/json"),
+]
+LOOKUPS = ["host", "origin", "Content-Type", "accept-encoding", "cookie", "range"]
+
+
+class ScanHeaders(Headers):
+    """lookups as they were done before the key index"""
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str):
+        h_k = key.lower().encode("latin-1")
+        for ik, iv in self._list:
+            if h_k == ik:
+                return iv.decode("latin-1")
+        raise KeyError(key)
+
+    def __contains__(self, key: str):
+        return key.lower() in self.keys()
+
+
+@pytest.mark.parametrize("headers_class", [ScanHeaders, Headers])
+@pytest.mark.benchmark(group="headers", max_time=0.2)
+def test_headers_lookups(benchmark, headers_class):
+    def lookups():
+        headers = headers_class(raw=RAW)
+        return [headers.get(key) for key in LOOKUPS if key in headers]
+
+    assert benchmark(lookups) == [
+        "example.org",
+        "application/json",
+        "gzip, deflate, br",
+        "session=abc; theme=dark",
+    ]
@@ -0,0 +1,36 @@
+import pytest
+
+from yast.config import JSONCodec
+
+PAYLOADS = {
+    "small": {"id": 1, "name": "yast", "active": True, "score": 9.5},
+    "records": [
+        {
+            "id": i,
+            "name": f"record-{i}",
+            "tags": ["a", "b", "c"],
+            "price": i * 1.25,
+            "meta": {"created": "2020-01-01T00:00:00", "owner": None},
+        }
+        for i in range(1000)
+    ],
+    "text": {"content": "ünïcödé text / " * 2000},
+}
+
+
+@pytest.mark.parametrize("payload", list(PAYLOADS))
+@pytest.mark.parametrize("name", JSONCodec().available())
+@pytest.mark.benchmark(group="json-dumps", max_time=0.2)
+def test_json_dumps(benchmark, name, payload):
+    codec = JSONCodec(name)
+    content = benchmark(codec.dumps, PAYLOADS[payload])
+    assert codec.loads(content) == PAYLOADS[payload]
+
+
+@pytest.mark.parametrize("payload", list(PAYLOADS))
+@pytest.mark.parametrize("name", JSONCodec().available())
+@pytest.mark.benchmark(group="json-loads", max_time=0.2)
+def test_json_loads(benchmark, name, payload):
+    codec = JSONCodec(name)
+    content = codec.dumps(PAYLOADS[payload])
+    assert benchmark(codec.loads, content) == PAYLOADS[payload]
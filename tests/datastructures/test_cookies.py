@@ -0,0 +1,73 @@
+import http.cookies
+
+import pytest
+
+from yast.datastructures import dump_cookie, parse_cookie
+
+COOKIE_HEADERS = [
+    "a=1",
+    "a=1; b=2",
+    "a=1;b=2;c=3",
+    "  a = 1 ;  b = 2  ",
+    "session=eyJhIjogMX0=.YWJj.ZGVm",
+    "a=1; a=2",
+    'a="quoted value"; b=2',
+    'a="with \\"escaped\\" quotes"',
+    'a="\\012octal"',
+    "tracking=GA1.2.123456789.1600000000; _gid=GA1.2.1.2",
+    "key=value%20with%20escapes; other=%3D%3B",
+    "a=; b=2",
+    "empty=",
+    "a=1; b=x:y|z~!#$%&'*+-.^_`",
+    "theme=dark; lang=en-US; tz=Europe/Paris",
+]
+
+
+@pytest.mark.parametrize("cookie_string", COOKIE_HEADERS)
+def test_parse_cookie_matches_simplecookie(cookie_string):
+    cookie = http.cookies.SimpleCookie()
+    cookie.load(cookie_string)
+    assert parse_cookie(cookie_string) == {k: m.value for k, m in cookie.items()}
+
+
+def test_parse_cookie_lenient():
+    assert parse_cookie("") == {}
+    assert parse_cookie("a=1; ; b") == {"a": "1", "": "b"}
+    assert parse_cookie("a=1; b=[2]; c=3") == {"a": "1", "b": "[2]", "c": "3"}
+    assert parse_cookie("a=1=2") == {"a": "1=2"}
+
+
+SET_COOKIES = [
+    dict(key="a", value="1"),
+    dict(key="a", value="with space"),
+    dict(key="a", value='quote"d;'),
+    dict(key="a", value="1", max_age=600, path="/", httponly=True),
+    dict(key="a", value="1", max_age="600", domain="example.org", secure=True),
+    dict(key="a", value="", max_age=0, expires="Thu, 01 Jan 1970 00:00:00 GMT"),
+    dict(key="a", value="1", path="", domain=""),
+    dict(key="a", value=123, path="/api", domain="example.org", secure=True),
+]
+
+
+@pytest.mark.parametrize("kwargs", SET_COOKIES)
+def test_dump_cookie_matches_simplecookie(kwargs):
+    kwargs = dict(kwargs)
+    key, value = kwargs.pop("key"), kwargs.pop("value")
+    cookie = http.cookies.SimpleCookie()
+    cookie[key] = value
+    for attr, attr_value in kwargs.items():
+        cookie[key][attr.replace("_", "-")] = attr_value
+    expected = cookie.output(header="").strip()
+    assert dump_cookie(key, value, **kwargs) == expected
+    assert dump_cookie(key, value, **kwargs) == expected
+
+
+def test_dump_cookie_expires():
+    cookie = dump_cookie("a", "1", expires=0, path="/")
+    assert cookie.startswith("a=1; expires=")
+    assert cookie.endswith(" GMT; Path=/")
+
+    with pytest.raises(http.cookies.CookieError):
+        dump_cookie("a b", "1")
+    with pytest.raises(http.cookies.CookieError):
+        dump_cookie("Path", "1")
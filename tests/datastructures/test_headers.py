@@ -38,3 +38,38 @@ def test_mutabheaders():
     assert dict(mh) == {"bb": "234"}
     mh.setdefault("CC", value="xxx")
     assert dict(mh) == {"bb": "234", "cc": "xxx"}
+
+
+def test_headers_index():
+    raw = [(b"a", b"123"), (b"b", b"456")]
+    h = Headers(raw=raw)
+    assert not hasattr(h, "__dict__")
+    assert h["A"] == "123"
+    assert "c" not in h
+
+    raw.append((b"c", b"789"))
+    assert h["c"] == "789"
+    del raw[0]
+    raw.append((b"a", b"abc"))
+    assert h.getlist("a") == ["abc"]
+    assert h["b"] == "456"
+
+    mh = MutableHeaders(raw=raw)
+    mh.append("A", "def")
+    mh["b"] = "xyz"
+    assert mh.getlist("a") == ["abc", "def"]
+    mh["a"] = "ghi"
+    assert mh.raw == [(b"b", b"xyz"), (b"c", b"789"), (b"a", b"ghi")]
+    assert h["a"] == "ghi"
+    del mh["c"]
+    assert "c" not in mh
+    assert "c" not in h
+    assert mh.setdefault("c", "000") == "000"
+    assert mh.setdefault("c", "111") == "000"
+    assert mh.items() == [("b", "xyz"), ("a", "ghi"), ("c", "000")]
+
+    mh = MutableHeaders(raw=[(b"a", b"1"), (b"b", b"2")])
+    assert mh["a"] == "1"
+    mh.raw[0] = (b"x", b"9")
+    assert "a" not in mh
+    assert mh["x"] == "9"
@@ -0,0 +1,44 @@
+from yast.datastructures.scope import (
+    scope_cookies,
+    scope_headers,
+    scope_host,
+    scope_query_params,
+    scope_url,
+)
+from yast.requests import Request
+
+
+def test_scope_cache():
+    scope = {
+        "type": "http",
+        "scheme": "http",
+        "server": ("example.org", 80),
+        "path": "/users",
+        "query_string": b"a=1",
+        "headers": [(b"host", b"example.org"), (b"cookie", b"theme=dark")],
+    }
+    headers = scope_headers(scope)
+    assert headers["host"] == "example.org"
+    assert scope_headers(scope) is headers
+    assert scope_url(scope) is scope_url(scope)
+    assert str(scope_url(scope)) == "http://example.org/users?a=1"
+    assert scope_query_params(scope) is scope_query_params(scope)
+    assert scope_cookies(scope) == {"theme": "dark"}
+    assert scope_host(scope) == "example.org"
+
+    req = Request(scope)
+    assert req.headers is headers
+    assert req.url is scope_url(scope)
+    assert req.query_params is scope_query_params(scope)
+    assert req.cookie is scope_cookies(scope)
+
+    child_scope = dict(scope, root_path="/api", path="/users/1", query_string=b"")
+    assert str(scope_url(child_scope)) == "http://example.org/api/users/1"
+    assert scope_headers(child_scope) is headers
+    assert dict(scope_query_params(child_scope)) == {}
+
+    scope["headers"] = [(b"host", b"example.com:8000")]
+    assert scope_host(scope) == "example.com"
+    assert scope_headers(scope)["host"] == "example.com:8000"
+    assert str(scope_url(scope)) == "http://example.com:8000/users?a=1"
+    assert scope_cookies(scope) == {}
@@ -1,3 +1,5 @@
+import asyncio
+import os
 import typing
 
 import pytest
@@ -5,7 +7,7 @@ import pytest
 from yast import TestClient, Yast
 from yast.middlewares import BaseHttpMiddleware
 from yast.requests import Request
-from yast.responses import PlainTextResponse
+from yast.responses import FileResponse, PlainTextResponse
 from yast.types import ASGIInstance
 
 
@@ -71,6 +73,16 @@ def test_vendor():
         client.get("/no_res")
 
 
+@pytest.mark.timeout(3)
+def test_head_method():
+    client = TestClient(app)
+    res = client.head("/")
+    assert res.status_code == 200
+    assert res.content == b""
+    assert res.headers["content-length"] == "5"
+    assert res.headers["Vendor-Header"] == "Vendor"
+
+
 @pytest.mark.timeout(3)
 def test_decorator():
     app = Yast()
@@ -94,3 +106,37 @@ def test_decorator():
     res = client.get("/homepage")
     assert res.text == "Homepage"
     assert res.headers["Handler"] == "@Func"
+
+
+def test_send_extensions_not_passed_through(tmpdir):
+    path = os.path.join(tmpdir, "example.txt")
+    with open(path, "wb") as file:
+        file.write(b"<file content>")
+
+    file_app = Yast()
+    file_app.add_middleware(VenderMiddleware)
+    file_app.add_route("/", lambda request: FileResponse(path))
+
+    messages = []
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "extensions": {"http.response.pathsend": {}, "http.response.zerocopysend": {}},
+    }
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(file_app(scope)(receive, send))
+    loop.close()
+    assert [m["type"] for m in messages][0] == "http.response.start"
+    assert all(m["type"] != "http.response.pathsend" for m in messages)
+    assert b"".join(m.get("body", b"") for m in messages) == b"<file content>"
@@ -1,6 +1,8 @@
+import gzip
+
 from yast.applications import Yast
 from yast.middlewares import GZipMiddleware
-from yast.responses import PlainTextResponse, StreamingResponse
+from yast.responses import PlainTextResponse, Response, StreamingResponse
 from yast.testclient import TestClient
 
 
@@ -71,3 +73,20 @@ def test_gzip_streaming_response():
     assert response.text == "x" * 4000
     assert response.headers["Content-Encoding"] == "gzip"
     assert "Content-Length" not in response.headers
+
+
+def test_gzip_ignored_for_encoded_responses():
+    app = Yast()
+    app.add_middleware(GZipMiddleware)
+
+    @app.route("/")
+    def homepage(request):
+        body = gzip.compress(b"x" * 4000)
+        return Response(body, headers={"content-encoding": "gzip"})
+
+    client = TestClient(app)
+    response = client.get("/", headers={"accept-encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.text == "x" * 4000
+    assert response.headers["content-encoding"] == "gzip"
+    assert "vary" not in response.headers
@@ -201,6 +201,54 @@ def test_exception_handler():
     assert res.text == "Err 405"
 
 
+def test_head_without_body():
+    import asyncio
+
+    from yast.exceptions import HttpException
+    from yast.middlewares import TrustedHostMiddleware
+
+    app = Yast()
+
+    @app.route("/403")
+    def forbidden(_):
+        raise HttpException(403)
+
+    def head(path, host="testserver"):
+        messages = []
+
+        async def receive():
+            return {"type": "http.request"}  # pragma: nocover
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "HEAD",
+            "path": path,
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"host", host.encode())],
+        }
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(app(scope)(receive, send))
+        loop.close()
+        return messages
+
+    messages = head("/missing")
+    assert messages[0]["status"] == 404
+    assert (b"content-length", b"9") in messages[0]["headers"]
+    assert [m["body"] for m in messages[1:]] == [b""]
+    messages = head("/403")
+    assert messages[0]["status"] == 403
+    assert [m["body"] for m in messages[1:]] == [b""]
+
+    app.add_middleware(TrustedHostMiddleware, allowed_hosts=["example.org"])
+    messages = head("/missing")
+    assert messages[0]["status"] == 400
+    assert [m["body"] for m in messages[1:]] == [b""]
+
+
 def test_subdomain():
     app = Yast()
     subdomain = Router()
@@ -226,3 +274,20 @@ def test_subdomain():
     res = client.get("/")
     assert res.status_code == 200
     assert res.text == "Subdomain:abc"
+
+
+def test_freeze_on_startup():
+    import pytest
+
+    app = Yast()
+
+    @app.route("/")
+    def homepage(request):
+        return PlainTextResponse("Hello, frozen")
+
+    app.add_event_handler("startup", app.freeze)
+    with TestClient(app) as client:
+        assert app.router.frozen
+        assert client.get("/").text == "Hello, frozen"
+        with pytest.raises(RuntimeError):
+            app.add_route("/late", homepage)
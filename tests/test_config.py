@@ -89,3 +89,48 @@ def test_environ():
     environ = Environ()
     assert list(iter(environ)) == list(iter(os.environ))
     assert len(environ) == len(os.environ)
+
+
+def test_json_codec():
+    from yast.config import JSONCodec
+
+    names = JSONCodec().available()
+    assert names[-1] == "json"
+    assert JSONCodec().name == names[0]
+
+    for name in names:
+        codec = JSONCodec(name)
+        content = codec.dumps({"a": [1, 2.5, None, True], "b": "é/</"})
+        assert isinstance(content, bytes)
+        assert b" " not in content
+        assert "é".encode("utf-8") in content
+        assert codec.loads(content) == {"a": [1, 2.5, None, True], "b": "é/</"}
+        assert codec.loads(content.decode("utf-8")) == codec.loads(content)
+        assert codec.loads(codec.dumps({1: "a"})) == {"1": "a"}
+        with pytest.raises(ValueError):
+            codec.loads(b"{1")
+        assert codec.loads(codec.dumps([2**70])) == [2**70]
+        for value in (float("nan"), float("inf"), -float("inf")):
+            with pytest.raises(ValueError):
+                codec.dumps({"a": [value]})
+
+    with pytest.raises(AssertionError):
+        JSONCodec("simplejson")
+
+
+def test_app_json_codec():
+    from yast import Yast
+    from yast.config import get_json_codec, json_codec
+    from yast.responses import PlainTextResponse
+    from yast.testclient import TestClient
+
+    first, second = Yast(json_codec="json"), Yast()
+
+    @first.route("/")
+    @second.route("/")
+    def name(request):
+        return PlainTextResponse(get_json_codec().name)
+
+    assert TestClient(first).get("/").text == "json"
+    assert TestClient(second).get("/").text == json_codec.name
+    assert get_json_codec() is json_codec
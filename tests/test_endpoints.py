@@ -1,3 +1,4 @@
+import asyncio
 import typing
 
 import pytest
@@ -69,3 +70,37 @@ def test_websocket_endpoint_on_receive_bytes():
         msg = "Hello, Bytes"
         s.send_bytes(msg.encode("utf-8"))
         s.receive_bytes() == (f"Received msg is {msg}").encode("utf-8")
+
+
+def test_http_endpoint_cancel_on_disconnect():
+    cleanup = []
+
+    class Report(HttpEndPoint):
+        cancel_on_disconnect = True
+
+        async def get(self, req: Request):
+            try:
+                await asyncio.sleep(10)
+            finally:
+                cleanup.append(req.disconnected.is_set())
+
+    sent = []
+
+    async def receive():
+        await asyncio.sleep(0.01)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)  # pragma: nocover
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": []}
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(asyncio.wait_for(Report(scope)(receive, send), 1))
+    assert cleanup == [True]
+    assert sent == []
+
+    # cancelled from outside before the client went away
+    with pytest.raises(asyncio.TimeoutError):
+        loop.run_until_complete(asyncio.wait_for(Report(scope)(receive, send), 0.001))
+    loop.close()
+    assert cleanup == [True, False]
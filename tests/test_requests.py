@@ -1,4 +1,5 @@
 import asyncio
+import json
 
 import pytest
 
@@ -345,3 +346,207 @@ def test_request_state():
     client = TestClient(app)
     response = client.get("/123?a=abc")
     assert response.json() == {"state.example": "abc"}
+
+
+def test_request_max_body_size():
+    from yast.exceptions import HttpException
+
+    def app(scope):
+        async def asgi(recv, send):
+            request = Request(scope, recv, max_body_size=4)
+            try:
+                body = await request.body()
+            except HttpException as exc:
+                response = JSONResponse({"status": exc.status_code})
+            else:
+                response = JSONResponse({"body": body.decode()})
+            await response(recv, send)
+
+        return asgi
+
+    client = TestClient(app)
+    assert client.post("/", data="1234").json() == {"body": "1234"}
+    assert client.post("/", data="12345").json() == {"status": 413}
+
+    def chunks():
+        yield b"123"
+        yield b"45"
+
+    assert client.post("/", data=chunks()).json() == {"status": 413}
+
+
+def test_app_max_body_size():
+    from yast import Yast
+
+    app = Yast(max_body_size=4)
+
+    @app.route("/", methods=["POST"])
+    async def echo(request):
+        return JSONResponse({"body": (await request.body()).decode()})
+
+    client = TestClient(app)
+    assert client.post("/", data="1234").json() == {"body": "1234"}
+    assert client.post("/", data="12345").status_code == 413
+
+
+def test_request_body_file(monkeypatch):
+    import tempfile
+
+    writes = []
+    rollovers = []
+
+    class SpooledTemporaryFile(tempfile.SpooledTemporaryFile):
+        def write(self, data):
+            writes.append(len(data))
+            return super().write(data)
+
+        def rollover(self):
+            if not self._rolled:
+                rollovers.append(True)
+            super().rollover()
+
+    monkeypatch.setattr(tempfile, "SpooledTemporaryFile", SpooledTemporaryFile)
+
+    def app(scope):
+        async def asgi(recv, send):
+            request = Request(scope, recv, spool_max_size=4)
+            request.spool_chunk_size = 4
+            body_file = await request.body_file()
+            first = body_file.read()
+            chunks = [chunk.decode() async for chunk in request.stream()]
+            body = await request.body()
+            await request.close()
+            response = JSONResponse(
+                {"file": first.decode(), "chunks": chunks[:-1], "body": body.decode()}
+            )
+            await response(recv, send)
+
+        return asgi
+
+    def body():
+        yield b"1"
+        yield b"23"
+        yield b"456"
+
+    client = TestClient(app)
+    assert client.post("/", data="12").json() == {
+        "file": "12",
+        "chunks": ["12"],
+        "body": "12",
+    }
+    assert writes == [2]
+    assert rollovers == []
+
+    writes.clear()
+    assert client.post("/", data=body()).json() == {
+        "file": "123456",
+        "chunks": ["1234", "56"],
+        "body": "123456",
+    }
+    # the body is written in batches of at least spool_chunk_size bytes
+    assert writes == [6]
+    assert rollovers == [True]
+
+
+def test_request_json_items():
+    def app(scope):
+        async def asgi(receive, send):
+            request = Request(scope, receive)
+            prefix = request.query_params.get("prefix", "item")
+            items = [item async for item in request.json_items(prefix)]
+            response = JSONResponse({"items": items})
+            await response(receive, send)
+
+        return asgi
+
+    client = TestClient(app)
+    data = [{"id": 1, "name": 'a"]},['}, 2.5e3, -1, "é", None, True, []]
+
+    def chunks(body, size):
+        for i in range(0, len(body), size):
+            yield body[i : i + size]
+
+    body = json.dumps(data).encode()
+    for size in (1, 3, 1024):
+        res = client.post("/", data=chunks(body, size))
+        assert res.json() == {"items": data}
+
+    body = json.dumps({"meta": {"data": [0]}, "data": data}).encode()
+    res = client.post("/?prefix=data.item", data=chunks(body, 2))
+    assert res.json() == {"items": data}
+    res = client.post("/?prefix=meta.data.item", data=body)
+    assert res.json() == {"items": [0]}
+    res = client.post("/?prefix=data", data=body)
+    assert res.json() == {"items": [data]}
+
+    with pytest.raises(json.JSONDecodeError):
+        client.post("/", data=b'[{"id": 1} {"id": 2}]')
+    with pytest.raises(json.JSONDecodeError):
+        client.post("/", data=b'[{"id": 1}')
+
+
+def test_request_watch_disconnect():
+    from yast.routing import Route, Router
+
+    events = []
+
+    async def report(request):
+        events.append(await request.body())
+        try:
+            await asyncio.sleep(10)
+        finally:
+            events.append(request.disconnected.is_set())
+
+    async def watched(request):
+        body = await request.body()
+        await request.disconnected.wait()
+        events.append(await request.is_disconnected())
+        return JSONResponse({"body": body.decode()})
+
+    app = Router(
+        [
+            Route("/report", report, cancel_on_disconnect=True),
+            Route("/watched", watched, watch_disconnect=True),
+        ]
+    )
+
+    async def run(path):
+        disconnect = asyncio.Event()
+        messages = [
+            {"type": "http.request", "body": b"ab", "more_body": True},
+            {"type": "http.request", "body": b"cd"},
+        ]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "query_string": b"",
+            "headers": [],
+        }
+        task = asyncio.ensure_future(app(scope)(receive, send))
+        await asyncio.sleep(0.01)
+        disconnect.set()
+        await asyncio.wait_for(task, 1)
+        return sent
+
+    loop = asyncio.new_event_loop()
+    assert loop.run_until_complete(run("/report")) == []
+    assert events == [b"abcd", True]
+
+    events.clear()
+    sent = loop.run_until_complete(run("/watched"))
+    loop.close()
+    assert events == [True]
+    assert sent[0]["status"] == 200
+    assert sent[1]["body"] == b'{"body":"abcd"}'
@@ -1,10 +1,24 @@
 import asyncio
+import gc
+import json
 import os
+import time
 
 import pytest
 
 from yast.background import BackgroundTask
-from yast.responses import FileResponse, RedirectResponse, Response, StreamingResponse
+from yast.responses import (
+    CSVResponse,
+    EventSourceResponse,
+    FileResponse,
+    NDJSONResponse,
+    PlainTextResponse,
+    RedirectResponse,
+    Response,
+    StreamingResponse,
+    encode_event,
+    parse_range_header,
+)
 from yast.testclient import TestClient
 
 
@@ -270,6 +284,28 @@ def test_file_response_with_missing_file_raises_error(tmpdir):
         client.get("/")
     assert "does not exist" in str(exc)
 
+    # a file gone after its stat fails before anything is sent
+    with open(path, "w") as file:
+        file.write("<file content>")
+    stat_result = os.stat(path)
+    os.remove(path)
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.request"}  # pragma: nocover
+
+    for extensions in ({}, {"http.response.pathsend": {}}):
+        response = FileResponse(path, stat_result=stat_result)
+        response.extensions = extensions
+        loop = asyncio.new_event_loop()
+        with pytest.raises(FileNotFoundError):
+            loop.run_until_complete(response(receive, send))
+        loop.close()
+    assert sent == []
+
 
 def test_response_no_content():
     def app(scope):
@@ -302,3 +338,559 @@ def test_form_urlencode():
 
     res = client.post("/", data={"abc": "123 @ aaa"})
     assert res.json() == {"form": {"abc": "123 @ aaa"}}
+
+
+def test_head_method(tmpdir):
+    from yast.routing import Route, Router
+
+    path = os.path.join(tmpdir, "example.txt")
+    with open(path, "wb") as file:
+        file.write(b"<file content>")
+    stat_result = os.stat(path)
+    iterated = []
+
+    async def numbers():
+        iterated.append(True)  # pragma: nocover
+        yield "1"  # pragma: nocover
+
+    def text(req):
+        return Response(b"hello, world", media_type="text/plain")
+
+    def stream(req):
+        return StreamingResponse(numbers(), media_type="text/plain")
+
+    def file(req):
+        return FileResponse(path + ".missing", stat_result=stat_result)
+
+    app = Router(
+        [
+            Route("/text", text, methods=["GET"]),
+            Route("/stream", stream, methods=["GET"]),
+            Route("/file", file, methods=["GET"]),
+        ]
+    )
+    client = TestClient(app)
+
+    res = client.head("/text")
+    assert res.status_code == 200
+    assert res.content == b""
+    assert res.headers["content-length"] == "12"
+
+    res = client.head("/stream")
+    assert res.status_code == 200
+    assert res.content == b""
+    assert iterated == []
+
+    res = client.head("/file")
+    assert res.status_code == 200
+    assert res.content == b""
+    assert res.headers["content-length"] == "14"
+
+
+def test_prepared_response():
+    from yast.responses import JSONResponse, PreparedResponse
+    from yast.routing import Route, Router
+
+    health = PreparedResponse(JSONResponse({"status": "ok"}))
+
+    def homepage(req):
+        return health
+
+    router = Router([Route("/health", homepage)])
+
+    def app(scope):
+        async def asgi(receive, send):
+            async def sender(message):
+                if message["type"] == "http.response.start":
+                    message["headers"].append((b"x-request", b"1"))
+                await send(message)
+
+            await router(scope)(receive, sender)
+
+        return asgi
+
+    client = TestClient(app)
+    for _ in range(2):
+        res = client.get("/health")
+        assert res.json() == {"status": "ok"}
+        assert res.headers["content-length"] == "15"
+        assert res.headers["x-request"] == "1"
+
+    res = client.head("/health")
+    assert res.content == b""
+    assert res.headers["content-length"] == "15"
+    assert health.header_only() is health.header_only()
+    assert health.raw_headers == [
+        (b"content-length", b"15"),
+        (b"content-type", b"application/json"),
+    ]
+
+    res = client.get("/missing")
+    assert res.status_code == 404
+    assert res.text == "Not Found"
+
+
+def test_streaming_response_coalesce():
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def rows():
+        for i in range(100):
+            yield f"{i:02d},"
+
+    async def slow_rows():
+        yield "a"
+        yield "b"
+        await asyncio.sleep(0.05)
+        assert [m.get("body") for m in sent[1:]] == [b"ab"]
+        yield "c"
+
+    loop = asyncio.new_event_loop()
+    res = StreamingResponse(rows(), coalesce_size=64)
+    loop.run_until_complete(res(None, send))
+    bodies = [message["body"] for message in sent[1:]]
+    assert b"".join(bodies).decode() == "".join(f"{i:02d}," for i in range(100))
+    assert all(len(body) == 66 for body in bodies[:-1])
+    assert res.chunks_produced == 100
+    assert res.messages_sent == len(bodies) == 5
+    assert sent[-1]["more_body"] is False
+
+    sent.clear()
+    res = StreamingResponse(slow_rows(), coalesce_size=1024, coalesce_delay=0.01)
+    loop.run_until_complete(res(None, send))
+    loop.close()
+    assert [message["body"] for message in sent[1:]] == [b"ab", b"c"]
+    assert res.chunks_produced == 3
+    assert res.messages_sent == 2
+
+    # finished delayed flushes are not kept until the stream ends
+    tasks = []
+
+    async def spaced_rows():
+        for i in range(30):
+            yield "x"
+            await asyncio.sleep(0.003)
+        gc.collect()
+        tasks.append(sum(isinstance(o, asyncio.Task) for o in gc.get_objects()))
+
+    sent.clear()
+    loop = asyncio.new_event_loop()
+    res = StreamingResponse(spaced_rows(), coalesce_delay=0.001)
+    loop.run_until_complete(res(None, send))
+    loop.close()
+    assert res.messages_sent > 10
+    assert tasks[0] < 10
+
+    async def broken_rows():
+        yield "a"
+        raise RuntimeError()
+
+    async def run_broken():
+        res = StreamingResponse(broken_rows(), coalesce_delay=0.01)
+        with pytest.raises(RuntimeError):
+            await res(None, send)
+        await asyncio.sleep(0.05)
+
+    sent.clear()
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(run_broken())
+    loop.close()
+    # the pending delayed flush is cancelled with the stream
+    assert [message["type"] for message in sent] == ["http.response.start"]
+
+
+def test_streaming_response_sync_iterator():
+    import threading
+
+    main_thread = threading.get_ident()
+    produced = []
+    closed = []
+
+    def rows():
+        try:
+            for i in range(10):
+                assert threading.get_ident() != main_thread
+                produced.append(i)
+                yield f"{i},"
+        finally:
+            closed.append(True)
+
+    def app(scope):
+        return StreamingResponse(rows(), media_type="text/csv")
+
+    client = TestClient(app)
+    res = client.get("/")
+    assert res.text == "0,1,2,3,4,5,6,7,8,9,"
+    assert closed == [True]
+
+    # a slow consumer only lets the producer run `prefetch` batches ahead
+    class Response(StreamingResponse):
+        thread_batch_size = 2
+        thread_prefetch = 1
+
+    produced.clear()
+    sent = []
+
+    async def send(message):
+        sent.append(len(produced))
+        await asyncio.sleep(0.01)
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(Response(rows())(None, send))
+    loop.close()
+    assert produced == list(range(10))
+    assert max(count - idx for idx, count in enumerate(sent[1:-1])) <= 6
+
+    # slow iterators stream each item as it is produced
+    def slow_rows():
+        for i in range(3):
+            time.sleep(0.05)
+            produced.append(i)
+            yield f"{i},"
+
+    produced.clear()
+    sent.clear()
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(StreamingResponse(slow_rows())(None, send))
+    assert sent[1:4] == [1, 2, 3]
+
+    # larger batches are handed over after `batch_delay`, not when full
+    class BulkResponse(StreamingResponse):
+        thread_batch_size = 64
+
+    produced.clear()
+    sent.clear()
+    loop.run_until_complete(BulkResponse(slow_rows())(None, send))
+    loop.close()
+    assert sent[1] == 2
+
+    def broken():
+        yield "a"
+        raise RuntimeError("broken")
+
+    with pytest.raises(RuntimeError):
+        TestClient(lambda scope: StreamingResponse(broken())).get("/")
+
+
+def test_file_response_send_modes(tmpdir):
+    path = os.path.join(tmpdir, "example.bin")
+    content = os.urandom(300 * 1024)
+    with open(path, "wb") as file:
+        file.write(content)
+
+    def run(response, extensions=None):
+        messages = []
+
+        async def send(message):
+            if message["type"] == "http.response.zerocopysend":
+                file = message["file"]
+                file.seek(message["offset"])
+                message = dict(message, body=file.read(message["count"]))
+            elif message["type"] == "http.response.pathsend":
+                with open(message["path"], "rb") as file:
+                    message = dict(message, body=file.read())
+            elif "body" in message:
+                assert type(message["body"]) is bytes
+            messages.append(message)
+
+        scope = {"type": "http", "method": "GET", "extensions": extensions or {}}
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(response.for_scope(scope)(None, send))
+        loop.close()
+        assert messages[0]["type"] == "http.response.start"
+        return messages[1:]
+
+    messages = run(FileResponse(path))
+    assert [len(m["body"]) for m in messages] == [64 * 1024, 128 * 1024, 108 * 1024]
+    assert [m["more_body"] for m in messages] == [True, True, False]
+    assert b"".join(m["body"] for m in messages) == content
+
+    class MmapResponse(FileResponse):
+        use_mmap = True
+        max_chunk_size = 256 * 1024
+
+    messages = run(MmapResponse(path))
+    assert [len(m["body"]) for m in messages] == [256 * 1024, 44 * 1024]
+    assert b"".join(m["body"] for m in messages) == content
+
+    messages = run(FileResponse(path), {"http.response.pathsend": {}})
+    assert messages[0]["path"] == os.path.abspath(path)
+    assert messages[0]["body"] == content
+
+    messages = run(FileResponse(path), {"http.response.zerocopysend": {}})
+    assert messages[0]["type"] == "http.response.zerocopysend"
+    assert (messages[0]["offset"], messages[0]["count"]) == (0, len(content))
+    assert messages[0]["body"] == content
+
+    shared = FileResponse(path)
+    assert run(shared, {"http.response.pathsend": {}})[0]["body"] == content
+    messages = run(shared)
+    assert messages[0]["type"] == "http.response.body"
+    assert shared.extensions == {}
+
+
+def test_parse_range_header():
+    assert parse_range_header("bytes=0-9", 100) == [(0, 9)]
+    assert parse_range_header("bytes=90-", 100) == [(90, 99)]
+    assert parse_range_header("bytes=-10", 100) == [(90, 99)]
+    assert parse_range_header("bytes=-500", 100) == [(0, 99)]
+    assert parse_range_header("bytes=50-500", 100) == [(50, 99)]
+    assert parse_range_header("bytes=10-19, 0-4, 15-29", 100) == [(0, 4), (10, 29)]
+    assert parse_range_header("bytes=0-4,5-9", 100) == [(0, 9)]
+    assert parse_range_header("bytes=100-", 100) == []
+    assert parse_range_header("bytes=-0", 100) == []
+    assert parse_range_header("bytes=9-0", 100) is None
+    assert parse_range_header("bytes=a-b", 100) is None
+    assert parse_range_header("bytes=-", 100) is None
+    assert parse_range_header("items=0-9", 100) is None
+    assert parse_range_header("bytes=" + ",".join(["0-1"] * 17), 100) is None
+
+
+def test_encode_event():
+    assert encode_event("hello") == b"data: hello\n\n"
+    assert encode_event("a\nb") == b"data: a\ndata: b\n\n"
+    assert encode_event({"x": 1}, event="update", id="7") == (
+        b'event: update\nid: 7\ndata: {"x":1}\n\n'
+    )
+    assert encode_event(retry=3000) == b"retry: 3000\n\n"
+    assert encode_event(comment="ping") == b": ping\n\n"
+    with pytest.raises(ValueError):
+        encode_event("x", id="1\n2")
+
+
+def test_event_source_response():
+    async def events():
+        yield "hello"
+        yield {"data": [1, 2], "event": "numbers", "id": "2"}
+
+    def app(scope):
+        return EventSourceResponse(events(), retry=1000)
+
+    client = TestClient(app)
+    res = client.get("/")
+    assert res.headers["content-type"] == "text/event-stream; charset=utf-8"
+    assert res.headers["cache-control"] == "no-cache"
+    assert res.text == (
+        "retry: 1000\n\ndata: hello\n\nevent: numbers\nid: 2\ndata: [1,2]\n\n"
+    )
+
+
+def test_event_source_response_heartbeat_and_disconnect():
+    closed = []
+
+    async def events():
+        try:
+            yield "first"
+            yield "second"
+            # longer than ping_interval, a ping is sent meanwhile
+            await asyncio.sleep(0.05)
+            yield "third"
+            await asyncio.sleep(10)
+        finally:
+            closed.append(True)
+
+    messages = []
+    third_sent = asyncio.Event()
+
+    async def send(message):
+        messages.append(message)
+        if b"data: third" in message.get("body", b""):
+            third_sent.set()
+
+    async def receive():
+        await third_sent.wait()
+        return {"type": "http.disconnect"}
+
+    async def run():
+        response = EventSourceResponse(events(), ping_interval=0.01, flush_window=0.001)
+        await response(receive, send)
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(run())
+    loop.close()
+
+    stream = b"".join(message["body"] for message in messages[1:])
+    assert stream.startswith(b"data: first\n\ndata: second\n\n")
+    assert stream.endswith(b"data: third\n\n")
+    assert b": ping\n\n" in stream
+    assert closed == [True]
+
+
+def test_event_source_response_background():
+    calls = []
+
+    async def task():
+        calls.append("start")
+        await asyncio.sleep(0.05)
+        calls.append("end")
+
+    async def events():
+        yield "hello"
+
+    def app(scope):
+        return EventSourceResponse(events(), background=BackgroundTask(task))
+
+    client = TestClient(app)
+    res = client.get("/")
+    assert res.text == "data: hello\n\n"
+    assert calls == ["start", "end"]
+
+
+def test_event_source_response_shares_request_watcher():
+    from yast.requests import Request
+
+    def app(scope):
+        async def asgi(receive, send):
+            request = Request(scope, receive)
+
+            async def events():
+                async for chunk in request.stream():
+                    if chunk:
+                        yield chunk.decode()
+
+            await EventSourceResponse(events(), request=request)(receive, send)
+            assert not request.watching
+
+        return asgi
+
+    def body():
+        yield b"a"
+        yield b"b"
+
+    client = TestClient(app)
+    res = client.post("/", data=body())
+    assert res.text == "data: a\n\ndata: b\n\n"
+
+
+def test_event_source_response_sync_events():
+    produced = []
+    sent = []
+
+    def events():
+        for i in range(3):
+            time.sleep(0.02)
+            produced.append(i)
+            yield str(i)
+
+    async def receive():
+        await asyncio.sleep(10)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message.get("body"):
+            sent.append((len(produced), message["body"]))
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(EventSourceResponse(events())(receive, send))
+    loop.close()
+    # each event goes out before the next one is produced
+    assert sent == [(1, b"data: 0\n\n"), (2, b"data: 1\n\n"), (3, b"data: 2\n\n")]
+
+
+def test_ndjson_response():
+    class SmallChunks(NDJSONResponse):
+        chunk_size = 256
+
+    def rows():
+        for i in range(1000):
+            yield {"id": i, "name": f"row {i}"}
+
+    async def async_rows():
+        for row in rows():
+            yield row
+
+    for content in (rows(), async_rows()):
+        response = SmallChunks(content)
+
+        def app(scope):
+            return response
+
+        client = TestClient(app)
+        res = client.get("/")
+        assert res.headers["content-type"] == "application/x-ndjson"
+        lines = res.text.splitlines()
+        assert len(lines) == 1000
+        assert json.loads(lines[-1]) == {"id": 999, "name": "row 999"}
+        # chunks are bounded by chunk_size plus one row
+        assert 50 < response.chunks_produced < 200
+
+
+def test_csv_response():
+    def app(scope):
+        rows = [["a", 1], ["b,c", 2], ['say "hi"', 3]]
+        return CSVResponse(rows, filename="export.csv")
+
+    client = TestClient(app)
+    res = client.get("/")
+    assert res.headers["content-type"] == "text/csv; charset=utf-8"
+    assert res.headers["content-disposition"] == 'attachment; filename="export.csv"'
+    assert res.text == 'a,1\r\n"b,c",2\r\n"say ""hi""",3\r\n'
+
+    async def rows():
+        yield {"id": 1, "name": "one"}
+        yield {"id": 2, "name": "two"}
+
+    def app(scope):
+        return CSVResponse(rows(), fieldnames=["id", "name"])
+
+    client = TestClient(app)
+    res = client.get("/")
+    assert res.text == "id,name\r\n1,one\r\n2,two\r\n"
+
+    def app(scope):
+        return CSVResponse([], fieldnames=["id"], filename='résumé "1"\r\n.csv')
+
+    client = TestClient(app)
+    res = client.get("/")
+    assert res.text == "id\r\n"
+    assert res.headers["content-disposition"] == (
+        "attachment; filename*=UTF-8''r%C3%A9sum%C3%A9%20%221%22%0D%0A.csv"
+    )
+
+    response = CSVResponse([])
+    assert response.write_row(["é"]) == len("é\r\n".encode("utf-8"))
+
+
+def test_response_reused_across_requests():
+    shared = PlainTextResponse("hello")
+
+    def app(scope):
+        async def asgi(receive, send):
+            async def sender(message):
+                if message["type"] == "http.response.start":
+                    message["headers"].append((b"set-cookie", b"session=1"))
+                await send(message)
+
+            await shared(receive, sender)
+
+        return asgi
+
+    client = TestClient(app)
+    for _ in range(3):
+        res = client.get("/")
+        assert res.text == "hello"
+        assert res.headers["set-cookie"] == "session=1"
+    assert shared.raw_headers == [
+        (b"content-length", b"5"),
+        (b"content-type", b"text/plain; charset=utf-8"),
+    ]
+
+
+def test_head_method_shared_response():
+    from yast.routing import Route, Router
+
+    shared = PlainTextResponse("hello")
+
+    def homepage(req):
+        return shared
+
+    client = TestClient(Router([Route("/", homepage)]))
+    res = client.head("/")
+    assert res.content == b""
+    assert res.headers["content-length"] == "5"
+
+    res = client.get("/")
+    assert res.text == "hello"
+    assert not shared.send_header_only
@@ -359,3 +359,252 @@ def test_mount_at_root():
     mounted = Router([Mount("/", ok, name="users")])
     client = TestClient(mounted)
     assert client.get("/").status_code == 200
+
+
+def test_route_tree_dispatch():
+    def item(req):
+        return JSONResponse({"item": req.path_params["item_id"]})
+
+    def item_file(req):
+        return PlainTextResponse(req.path_params["name"])
+
+    def price(req):
+        return JSONResponse({"price": req.path_params["price"]})
+
+    tree_app = Router(
+        routes=[
+            Route("/", endpoint=home),
+            Route("/items/{item_id:int}", endpoint=item),
+            Route("/items/{item_id:int}", endpoint=item, methods=["POST"]),
+            Route("/items/file-{name}.txt", endpoint=item_file),
+            Route("/price/{price:float}", endpoint=price),
+            Route("/func", endpoint=http_endpoint, methods=["POST"]),
+            Mount("/users", routes=[Route("/{username}", endpoint=users)]),
+            WebSocketRoute("/ws", endpoint=ws_endpoint),
+            Mount("/static", app=staticfiles),
+        ],
+        route_tree=True,
+    )
+    client = TestClient(tree_app)
+
+    assert client.get("/").text == "Hello Home"
+    assert client.get("/items/12").json() == {"item": 12}
+    assert client.post("/items/12").json() == {"item": 12}
+    assert client.put("/items/12").status_code == 405
+    assert client.get("/items/file-a.txt").text == "a"
+    assert client.get("/price/1.5").json() == {"price": 1.5}
+    assert client.get("/users/eml").text == "User eml"
+    assert client.get("/func").status_code == 405
+    assert client.get("/items/abc").status_code == 404
+    assert client.get("/static/a/b").text == "xxxx"
+    with client.wsconnect("/ws") as ss:
+        assert ss.receive_text() == "Hello, Ws"
+
+    tree_app.add_route("/late", endpoint=http_endpoint)
+    assert client.get("/late").text == "Hello, Http"
+
+    candidates = tree_app.candidates({"type": "http", "path": "/items/12"})
+    assert [route.path for route in candidates] == [
+        "/items/{item_id:int}",
+        "/items/{item_id:int}",
+        "/items/file-{name}.txt",
+        "/price/{price:float}",
+    ]
+
+
+def test_url_path_lookup_index():
+    def user(req):
+        return PlainTextResponse("user")
+
+    lookup_app = Router(
+        routes=[
+            Route("/", endpoint=home, name="home"),
+            Mount(
+                "/{version:int}/users",
+                routes=[Route("/{username}", endpoint=user, name="user")],
+                name="users",
+            ),
+            Mount("/misc", routes=[Route("/about", endpoint=home, name="about")]),
+        ]
+    )
+    assert lookup_app.url_path_lookup("home", {}) == "/"
+    assert lookup_app.url_path_lookup("home", {"extra": 1}) is None
+    assert lookup_app.url_path_lookup("missing", {}) is None
+    assert lookup_app.url_path_lookup("users:user", {"username": "tom"}) is None
+    assert (
+        lookup_app.url_path_lookup("users:user", {"version": 2, "username": "tom"})
+        == "/2/users/tom"
+    )
+    assert lookup_app.url_path_for("about") == "/misc/about"
+    with pytest.raises(NoMatchFound):
+        lookup_app.url_path_for("users:missing", version=2)
+
+    lookup_app.mount("/late", app=Router([Route("/", home, name="late")]), name="l")
+    assert lookup_app.url_path_for("l:late") == "/late/"
+
+    lookup_app.routes[1].routes.append(Route("/", endpoint=user, name="all"))
+    assert lookup_app.url_path_for("users:all", version=1) == "/1/users/"
+
+
+def test_redirect_slashes_table():
+    slash_app = Router(
+        routes=[
+            Route("/about/", endpoint=home),
+            Route("/items/{item_id:int}/", endpoint=home),
+            Mount("/docs", app=staticfiles),
+            WebSocketRoute("/ws/", endpoint=ws_endpoint),
+        ]
+    )
+    client = TestClient(slash_app)
+
+    res = client.get("/about", allow_redirects=False)
+    assert res.status_code == 302
+    assert res.headers["location"] == "http://testserver/about/"
+    assert client.get("/docs").url == "http://testserver/docs/"
+    assert slash_app.redirect_fallbacks == 0
+
+    res = client.get("/items/1", allow_redirects=False)
+    assert res.status_code == 302
+    assert res.headers["location"] == "http://testserver/items/1/"
+    assert slash_app.redirect_fallbacks == 1
+
+    assert client.get("/ws").status_code == 404
+    assert slash_app.redirect_fallbacks == 2
+
+    static_app = Router(routes=[Route("/about/", endpoint=home)])
+    assert TestClient(static_app).get("/missing").status_code == 404
+    assert static_app.redirect_fallbacks == 0
+
+
+def test_host_table_dispatch():
+    def tenant(scope):
+        return PlainTextResponse(scope["path_params"].get("tenant", "exact"))
+
+    hosts_app = Router(
+        routes=[
+            Host("www.example.org", app=tenant),
+            Host("{tenant}.example.org", app=tenant),
+            Host("{tenant}-api.example.org", app=tenant),
+            Host("{tenant}", app=tenant),
+        ]
+    )
+    assert TestClient(hosts_app, base_url="http://www.example.org").get("/").text == (
+        "exact"
+    )
+    assert TestClient(hosts_app, base_url="http://a.example.org").get("/").text == "a"
+    assert (
+        TestClient(hosts_app, base_url="http://b-api.example.org:8000").get("/").text
+        == "b-api"
+    )
+    assert TestClient(hosts_app, base_url="http://other").get("/").text == "other"
+    assert TestClient(hosts_app, base_url="http://x.y.z").get("/").text == "x.y.z"
+
+    table = hosts_app._host_table
+    assert table.exact == {"www.example.org": [0]}
+    assert table.suffixes == {"example.org": [1, 2]}
+    assert table.parametric == [3]
+    assert table.lookup("x.example.org") == [3, 1, 2]
+    assert table.lookup("x.example.com") == [3]
+
+
+@pytest.mark.parametrize("route_tree", [False, True])
+def test_router_freeze(route_tree):
+    def root_path(req):
+        return JSONResponse(
+            {"root_path": req["root_path"], "path": req["path"], **req.path_params}
+        )
+
+    inner = Router([Route("/{name}", endpoint=root_path)])
+    route_items = Route("/items/{item_id:int}", root_path)
+    frozen_app = Router(
+        routes=[
+            Mount(
+                "/api",
+                routes=[
+                    Mount("/v1", routes=[route_items]),
+                    Mount("/{version}", routes=[Route("/items", root_path)]),
+                ],
+            ),
+            Mount("/inner", app=inner),
+        ],
+        route_tree=route_tree,
+    )
+    frozen_app.freeze()
+    client = TestClient(frozen_app)
+
+    assert client.get("/api/v1/items/3").json() == {
+        "root_path": "/api/v1",
+        "path": "/items/3",
+        "item_id": 3,
+    }
+    res = client.get("/api/v2/items").json()
+    assert res["root_path"] == "/api/v2"
+    assert res["path"] == "/items"
+    assert client.post("/api/v1/items/3").status_code == 405
+    assert client.get("/api/v1/missing").status_code == 404
+    assert client.get("/api").url == "http://testserver/api/"
+    assert client.get("/inner/a").json() == {
+        "root_path": "/inner",
+        "path": "/a",
+        "name": "a",
+    }
+    assert frozen_app.url_path_for("root_path", item_id=3) == "/api/v1/items/3"
+
+    scope = {"type": "http", "path": "/api/v1/items/3"}
+    first = frozen_app.candidates(scope)[0]
+    if route_tree:
+        # the nested route is found without going through the mounts
+        assert getattr(first, "route", None) is route_items
+    else:
+        assert first is frozen_app.routes[0]
+
+    with pytest.raises(RuntimeError):
+        frozen_app.add_route("/late", endpoint=home)
+    with pytest.raises(RuntimeError):
+        frozen_app.routes[0].app.mount("/late", app=staticfiles)
+    assert not inner.frozen
+    inner.add_route("/", endpoint=home)
+
+
+def test_route_match_cache():
+    def item(req):
+        params = sorted(req.path_params)
+        req.path_params["touched"] = True
+        return JSONResponse({"item": req.path_params["item_id"], "params": params})
+
+    cached_app = Router(
+        routes=[
+            Route("/items/{item_id:int}", endpoint=item),
+            WebSocketRoute("/ws/{room}", endpoint=ws_endpoint_room),
+        ],
+        match_cache_size=2,
+    )
+    client = TestClient(cached_app)
+    cache = cached_app.match_cache
+
+    assert client.get("/items/1").json()["item"] == 1
+    assert client.get("/items/1").json()["item"] == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    # hits get their own copy of the cached path params
+    assert client.get("/items/1").json()["params"] == ["item_id"]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    assert client.post("/items/1").status_code == 405
+    assert client.post("/items/1").status_code == 405
+    assert (cache.hits, cache.misses) == (3, 2)
+
+    # the least recently used match is evicted
+    assert client.get("/items/2").json()["item"] == 2
+    assert len(cache) == 2
+    assert client.post("/items/1").status_code == 405
+    assert client.get("/items/1").json()["item"] == 1
+    assert (cache.hits, cache.misses) == (4, 4)
+
+    assert client.get("/missing").status_code == 404
+    assert len(cache) == 2
+
+    with client.wsconnect("/ws/abc") as ss:
+        assert ss.receive_text() == "Hello, Ws at abc"
+
+    cached_app.add_route("/items/{item_id:int}/detail", endpoint=item)
+    assert len(cache) == 0
@@ -1,10 +1,14 @@
+import asyncio
+import gzip
+import hashlib
 import os
 import typing
 from email.utils import parsedate
 
 import pytest
 
-from yast import TestClient
+from yast import TestClient, Yast, staticfiles
+from yast.responses import FileResponse, PlainTextResponse
 from yast.staticfiles import StaticFiles
 
 
@@ -103,6 +107,407 @@ def test_304_with_etag_match(tmpdir):
     assert res_2nd.content == b""
 
 
+def test_staticfiles_range_requests(tmpdir):
+    path = os.path.join(tmpdir, "example.txt")
+    with open(path, "w") as file:
+        file.write("0123456789abcdefghij")
+
+    app = StaticFiles(directory=tmpdir)
+    client = TestClient(app)
+
+    res = client.get("/example.txt")
+    assert res.headers["accept-ranges"] == "bytes"
+    etag = res.headers["etag"]
+
+    res = client.get("/example.txt", headers={"range": "bytes=2-5"})
+    assert res.status_code == 206
+    assert res.content == b"2345"
+    assert res.headers["content-range"] == "bytes 2-5/20"
+    assert res.headers["content-length"] == "4"
+
+    res = client.get("/example.txt", headers={"range": "bytes=-3"})
+    assert res.status_code == 206
+    assert res.content == b"hij"
+
+    res = client.get("/example.txt", headers={"range": "bytes=0-1,10-11"})
+    assert res.status_code == 206
+    content_type, boundary = res.headers["content-type"].split("; boundary=")
+    assert content_type == "multipart/byteranges"
+    assert res.headers["content-length"] == str(len(res.content))
+    assert (
+        res.content
+        == (
+            f"--{boundary}\r\nContent-Type: text/plain; charset=utf-8\r\n"
+            f"Content-Range: bytes 0-1/20\r\n\r\n01\r\n"
+            f"--{boundary}\r\nContent-Type: text/plain; charset=utf-8\r\n"
+            f"Content-Range: bytes 10-11/20\r\n\r\nab\r\n--{boundary}--\r\n"
+        ).encode()
+    )
+
+    res = client.get("/example.txt", headers={"range": "bytes=20-"})
+    assert res.status_code == 416
+    assert res.headers["content-range"] == "bytes */20"
+    assert res.content == b""
+
+    res = client.get("/example.txt", headers={"range": "bytes=5-2"})
+    assert res.status_code == 200
+    assert res.content == b"0123456789abcdefghij"
+
+    res = client.get("/example.txt", headers={"range": "bytes=0-1", "if-range": etag})
+    assert res.status_code == 206
+    assert res.content == b"01"
+
+    res = client.get(
+        "/example.txt", headers={"range": "bytes=0-1", "if-range": '"stale"'}
+    )
+    assert res.status_code == 200
+    assert len(res.content) == 20
+
+    res = client.head("/example.txt", headers={"range": "bytes=2-5"})
+    assert res.status_code == 206
+    assert res.headers["content-length"] == "4"
+    assert res.content == b""
+
+
+def test_staticfiles_hot_cache(tmpdir, monkeypatch):
+    path = os.path.join(tmpdir, "example.css")
+    with open(path, "w") as file:
+        file.write("body {}")
+    with open(os.path.join(tmpdir, "large.js"), "w") as file:
+        file.write("x" * 100)
+
+    stat_calls = []
+    aio_stat = staticfiles.aio_stat
+
+    async def counting_stat(path):
+        if str(path).endswith(".css"):
+            stat_calls.append(path)
+        return await aio_stat(path)
+
+    monkeypatch.setattr(staticfiles, "aio_stat", counting_stat)
+    app = StaticFiles(directory=tmpdir, cache_max_file_size=64, cache_revalidate=60)
+    client = TestClient(app)
+
+    res = client.get("/example.css")
+    assert res.status_code == 200
+    assert res.text == "body {}"
+    assert res.headers["content-type"] == "text/css; charset=utf-8"
+    assert len(stat_calls) == 1
+
+    res = client.get("/example.css")
+    assert res.text == "body {}"
+    assert len(stat_calls) == 1
+
+    res = client.get("/example.css", headers={"if-none-match": res.headers["etag"]})
+    assert res.status_code == 304
+    assert len(stat_calls) == 1
+
+    res = client.head("/example.css")
+    assert res.headers["content-length"] == "7"
+    assert res.content == b""
+
+    res = client.get("/large.js")
+    assert res.text == "x" * 100
+    assert list(app.cache) == [("example.css", (), False)]
+
+    app.cache_revalidate = 0
+    with open(path, "w") as file:
+        file.write("body { margin: 0 }")
+    os.utime(path, (0, 0))
+    res = client.get("/example.css")
+    assert res.text == "body { margin: 0 }"
+    assert app.cache_size == 18
+
+    os.remove(path)
+    res = client.get("/example.css")
+    assert res.status_code == 404
+    assert app.cache_size == 0
+
+
+def test_staticfiles_hot_cache_budget(tmpdir):
+    for name in ("a.txt", "b.txt", "c.txt"):
+        with open(os.path.join(tmpdir, name), "w") as file:
+            file.write(name * 4)
+
+    app = StaticFiles(directory=tmpdir, cache_max_file_size=64, cache_max_size=40)
+    client = TestClient(app)
+
+    client.get("/a.txt")
+    client.get("/b.txt")
+    client.get("/a.txt")
+    client.get("/c.txt")
+    assert list(app.cache) == [("a.txt", (), False), ("c.txt", (), False)]
+    assert app.cache_size == 40
+
+
+def test_staticfiles_precompressed(tmpdir, capsys):
+    path = os.path.join(tmpdir, "app.js")
+    content = b"console.log('hello');\n" * 32
+    with open(path, "wb") as file:
+        file.write(content)
+    with open(os.path.join(tmpdir, "app.js.br"), "wb") as file:
+        file.write(b"<brotli>")
+    os.utime(path, (0, 0))
+    assert staticfiles.compress_directory(str(tmpdir), encodings=("gzip",)) == [
+        path + ".gz"
+    ]
+    assert staticfiles.compress_directory(str(tmpdir), encodings=("gzip",)) == []
+    staticfiles.main([str(tmpdir), "--force"])
+    assert capsys.readouterr().out == path + ".gz\n"
+
+    app = StaticFiles(directory=tmpdir, precompressed=True)
+    client = TestClient(app)
+
+    res = client.get("/app.js", headers={"accept-encoding": "gzip, deflate"})
+    assert res.content == content
+    assert res.headers["content-encoding"] == "gzip"
+    assert res.headers["content-type"].startswith("text/javascript")
+    assert res.headers["vary"] == "accept-encoding"
+    gzip_etag = res.headers["etag"]
+    assert gzip_etag.endswith("-gzip")
+
+    res = client.get("/app.js", headers={"accept-encoding": "br;q=0, gzip"})
+    assert res.headers["content-encoding"] == "gzip"
+
+    res = client.get("/app.js", headers={"accept-encoding": "identity"})
+    assert res.content == content
+    assert "content-encoding" not in res.headers
+    assert res.headers["vary"] == "accept-encoding"
+    assert res.headers["etag"] != gzip_etag
+
+    res = client.get(
+        "/app.js", headers={"accept-encoding": "gzip", "if-none-match": gzip_etag}
+    )
+    assert res.status_code == 304
+    res = client.get(
+        "/app.js", headers={"accept-encoding": "identity", "if-none-match": gzip_etag}
+    )
+    assert res.status_code == 200
+
+    app = StaticFiles(directory=tmpdir, precompressed=True, cache_max_file_size=1024)
+    client = TestClient(app)
+    res = client.get("/app.js", headers={"accept-encoding": "gzip"})
+    assert res.content == content
+    res = client.get("/app.js", headers={"accept-encoding": "identity"})
+    assert res.content == content
+    assert list(app.cache) == [("app.js", ("gzip",), False), ("app.js", (), False)]
+
+    # brotli body is served as is to clients accepting it
+    app = StaticFiles(directory=tmpdir, precompressed=True)
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/app.js",
+        "headers": [(b"accept-encoding", b"br, gzip")],
+    }
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(app(scope)(None, send))
+    loop.close()
+    assert (b"content-encoding", b"br") in messages[0]["headers"]
+    assert messages[1]["body"] == b"<brotli>"
+
+
+def test_staticfiles_manifest(tmpdir, monkeypatch):
+    first = os.path.join(tmpdir, "first")
+    second = os.path.join(tmpdir, "second")
+    os.makedirs(os.path.join(second, "css"))
+    os.makedirs(first)
+    with open(os.path.join(first, "a.txt"), "w") as file:
+        file.write("first a")
+    with open(os.path.join(second, "a.txt"), "w") as file:
+        file.write("second a")
+    with open(os.path.join(second, "css", "b.css"), "w") as file:
+        file.write("second b")
+
+    stat_calls = []
+    aio_stat = staticfiles.aio_stat
+
+    async def counting_stat(path):
+        stat_calls.append(path)
+        return await aio_stat(path)
+
+    monkeypatch.setattr(staticfiles, "aio_stat", counting_stat)
+    app = StaticFiles(directory=first, use_manifest=True)
+    app.all_directories.append(second)
+    client = TestClient(app)
+
+    assert client.get("/a.txt").text == "first a"
+    res = client.get("/css/b.css")
+    assert res.text == "second b"
+    assert res.headers["content-type"] == "text/css; charset=utf-8"
+    assert client.get("/missing.txt").status_code == 404
+    assert client.get("/css").status_code == 404
+    assert stat_calls == [first]
+
+    with open(os.path.join(first, "c.txt"), "w") as file:
+        file.write("first c")
+    assert client.get("/c.txt").status_code == 404
+
+    async def rescan():
+        app.manifest_rescan = 0.01
+        await app.startup()
+        with open(os.path.join(first, "d.txt"), "w") as file:
+            file.write("first d")
+        await asyncio.sleep(0.1)
+        await app.shutdown()
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(rescan())
+    loop.close()
+    assert client.get("/c.txt").text == "first c"
+    assert client.get("/d.txt").text == "first d"
+    assert app.rescan_task is None
+
+    # files deleted after the scan are dropped instead of failing mid-response
+    os.remove(os.path.join(first, "d.txt"))
+    res = client.get("/d.txt")
+    assert res.status_code == 404
+    assert res.text == "Not Found"
+    assert "d.txt" not in app.manifest
+    assert client.get("/c.txt").text == "first c"
+
+
+def test_staticfiles_manifest_first_scan(tmpdir):
+    with open(os.path.join(tmpdir, "a.txt"), "w") as file:
+        file.write("plain a")
+    with open(os.path.join(tmpdir, "a.txt.gz"), "wb") as file:
+        file.write(gzip.compress(b"plain a"))
+
+    app = StaticFiles(directory=tmpdir, use_manifest=True, precompressed=True)
+    scans = []
+    build_manifest = app.build_manifest
+
+    def counting_build_manifest():
+        scans.append(1)
+        return build_manifest()
+
+    app.build_manifest = counting_build_manifest
+
+    async def request():
+        sent = []
+
+        async def receive():
+            return {"type": "http.request"}  # pragma: nocover
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/a.txt", "headers": []}
+        await app(scope)(receive, send)
+        return sent[0]["status"]
+
+    async def main():
+        return await asyncio.gather(*(request() for _ in range(5)))
+
+    loop = asyncio.new_event_loop()
+    assert loop.run_until_complete(main()) == [200] * 5
+    loop.close()
+    assert scans == [1]
+
+    # a deleted sidecar falls back to the source file
+    os.remove(os.path.join(tmpdir, "a.txt.gz"))
+    client = TestClient(app)
+    res = client.get("/a.txt", headers={"accept-encoding": "gzip"})
+    assert res.text == "plain a"
+    assert "content-encoding" not in res.headers
+
+
+def test_staticfiles_manifest_headers(tmpdir, monkeypatch):
+    with open(os.path.join(tmpdir, "a.txt"), "w") as file:
+        file.write("plain a")
+    with open(os.path.join(tmpdir, "a.txt.gz"), "wb") as file:
+        file.write(gzip.compress(b"plain a"))
+
+    app = StaticFiles(directory=tmpdir, use_manifest=True, precompressed=True)
+    client = TestClient(app)
+    plain = client.get("/a.txt", headers={"accept-encoding": "identity"})
+    encoded = client.get("/a.txt", headers={"accept-encoding": "gzip"})
+
+    stat_headers = []
+
+    def counting_get_stat_headers(stat_result):
+        stat_headers.append(stat_result)
+        return {}
+
+    # manifest hits reuse the headers computed by the manifest
+    monkeypatch.setattr(
+        FileResponse, "get_stat_headers", staticmethod(counting_get_stat_headers)
+    )
+    res = client.get("/a.txt", headers={"accept-encoding": "identity"})
+    assert res.text == "plain a"
+    assert res.headers["etag"] == plain.headers["etag"]
+    assert res.headers["content-length"] == "7"
+    res = client.get("/a.txt", headers={"accept-encoding": "gzip"})
+    assert res.text == "plain a"
+    assert res.headers["etag"] == encoded.headers["etag"]
+    assert res.headers["content-encoding"] == "gzip"
+    assert stat_headers == []
+
+
+def test_staticfiles_fingerprint(tmpdir):
+    os.makedirs(os.path.join(tmpdir, "css"))
+    path = os.path.join(tmpdir, "css", "app.css")
+    with open(path, "w") as file:
+        file.write("body {}")
+    with open(path + ".gz", "wb") as file:
+        file.write(gzip.compress(b"body {}"))
+    digest = hashlib.md5(b"body {}").hexdigest()[:12]
+
+    static = StaticFiles(directory=tmpdir, fingerprint=True, precompressed=True)
+    assert static.static_url("css/app.css") == "css/app.css"
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(static.startup())
+    assert static.static_url("css/app.css") == f"css/app.{digest}.css"
+    assert static.static_url("css/missing.css") == "css/missing.css"
+    assert list(static.fingerprints) == ["css/app.css"]
+
+    app = Yast()
+    app.mount("/static", static, name="static")
+
+    @app.route("/")
+    def homepage(request):
+        return PlainTextResponse(str(request.url_for("static", path="/css/app.css")))
+
+    client = TestClient(app)
+    url = client.get("/").text
+    assert url == f"http://testserver/static/css/app.{digest}.css"
+
+    res = client.get(url)
+    assert res.text == "body {}"
+    assert res.headers["cache-control"] == "public, max-age=31536000, immutable"
+    res = client.get(url, headers={"accept-encoding": "gzip"})
+    assert res.headers["content-encoding"] == "gzip"
+    assert res.headers["cache-control"] == "public, max-age=31536000, immutable"
+
+    res = client.get("/static/css/app.css")
+    assert res.text == "body {}"
+    assert "cache-control" not in res.headers
+    assert client.get("/static/css/app.0123456789ab.css").status_code == 404
+
+    with open(path, "w") as file:
+        file.write("body { margin: 0 }")
+    loop.run_until_complete(static.startup())
+    loop.close()
+    assert static.static_url("css/app.css") != f"css/app.{digest}.css"
+    assert client.get(url).status_code == 404
+
+    # urls rendered before `startup` stay plain and are still served
+    app.mount("/fresh", StaticFiles(directory=tmpdir, fingerprint=True), name="fresh")
+
+    @app.route("/fresh-url")
+    def fresh_url(request):
+        return PlainTextResponse(str(request.url_for("fresh", path="/css/app.css")))
+
+    url = client.get("/fresh-url").text
+    assert url == "http://testserver/fresh/css/app.css"
+    assert client.get(url).text == "body { margin: 0 }"
+
+
 def test_304_with_last_modified(tmpdir):
     import time
 
@@ -3,6 +3,7 @@ import os
 from yast import TestClient, Yast
 from yast.responses import HTMLResponse
 from yast.plugins.template import templates
+from yast.staticfiles import StaticFiles
 
 
 def test_templates(tmpdir):
@@ -19,3 +20,43 @@ def test_templates(tmpdir):
     client = TestClient(app)
     res = client.get("/")
     assert res.text == '<h1>Hello</h1><a href="http://testserver/">Template</a>'
+
+
+def test_templates_static_url(tmpdir):
+    path = os.path.join(tmpdir, "page.html")
+    with open(path, "w") as f:
+        f.write("{{ url_for('static', path='app.js') }}")
+    statics = os.path.join(tmpdir, "statics")
+    os.makedirs(statics)
+    with open(os.path.join(statics, "app.js"), "w") as f:
+        f.write("alert(1)")
+
+    app = Yast(plugins={"template": {"template_directory": tmpdir}})
+    static = StaticFiles(directory=statics, fingerprint=True)
+    app.mount("/static", static, name="static")
+    app.add_event_handler("startup", static.startup)
+
+    @app.route("/")
+    async def page(req):
+        return templates.response("page.html", request=req)
+
+    with TestClient(app) as client:
+        res = client.get("/")
+        assert res.text == "http://testserver/static/app.238e96d5b62a.js"
+        assert client.get(res.text).text == "alert(1)"
+
+
+def test_templates_default_context(tmpdir):
+    path = os.path.join(tmpdir, "page.html")
+    with open(path, "w") as f:
+        f.write("{{ request.url.path }}")
+
+    app = Yast(plugins={"template": {"template_directory": tmpdir}})
+
+    @app.route("/{name}")
+    async def page(req):
+        return templates.response("page.html", request=req)
+
+    client = TestClient(app)
+    assert client.get("/first").text == "/first"
+    assert client.get("/second").text == "/second"
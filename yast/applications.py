@@ -1,9 +1,11 @@
+import functools
 import typing
 
+from yast.config import JSONCodec, current_json_codec
 from yast.datastructures import URLPath
 from yast.middlewares import BaseHttpMiddleware
 from yast.routing import BaseRoute, Router
-from yast.types import ASGIApp, ASGIInstance, Scope
+from yast.types import ASGIApp, ASGIInstance, Message, Receive, Scope, Send
 
 
 class Yast(object):
@@ -13,15 +15,23 @@ class Yast(object):
         routes: typing.List[BaseRoute] = None,
         template_directory: str = None,
         config: dict = None,
+        route_tree: bool = False,
+        match_cache_size: int = 0,
+        json_codec: str = None,
+        max_body_size: int = None,
         **kwargs,
     ) -> None:
         self._debug = debug
-        self.router = Router(routes=routes)
+        self.json_codec = None if json_codec is None else JSONCodec(json_codec)
+        self.router = Router(
+            routes=routes, route_tree=route_tree, match_cache_size=match_cache_size
+        )
         self.app = self.router
         self.middleware_app = self.app
         self._register_fun_attr = {}
         self.config = {
             "template_directory": template_directory,
+            "max_body_size": max_body_size,
             "plugins": {
                 "exceptions": {
                     "middlewares": {
@@ -87,9 +97,15 @@ class Yast(object):
         methods: list[str] = None,
         name: str = None,
         include_in_schema: bool = True,
+        **kwargs: typing.Any,
     ) -> None:
         self.router.add_route(
-            path, route, methods=methods, name=name, include_in_schema=include_in_schema
+            path,
+            route,
+            methods=methods,
+            name=name,
+            include_in_schema=include_in_schema,
+            **kwargs,
         )
 
     def add_route_ws(
@@ -111,10 +127,16 @@ class Yast(object):
         methods: list[str] = None,
         name: str = None,
         include_in_schema: bool = True,
+        **kwargs: typing.Any,
     ) -> typing.Callable:
         def decorator(func):
             self.router.add_route(
-                path, func, methods, name=name, include_in_schema=include_in_schema
+                path,
+                func,
+                methods,
+                name=name,
+                include_in_schema=include_in_schema,
+                **kwargs,
             )
             return func
 
@@ -137,9 +159,43 @@ class Yast(object):
 
         return decorator
 
+    def freeze(self) -> None:
+        self.router.freeze()
+
     def url_path_for(self, name, **path_params: str) -> URLPath:
         return self.router.url_path_for(name=name, **path_params)
 
     def __call__(self, scope: Scope) -> ASGIInstance:
         scope["app"] = self
-        return self.middleware_app(scope)
+        instance = self.middleware_app(scope)
+        if scope["type"] == "http" and scope["method"] == "HEAD":
+            instance = functools.partial(self.without_body, instance=instance)
+        if self.json_codec is None:
+            return instance
+        return functools.partial(self.with_json_codec, instance=instance)
+
+    async def with_json_codec(
+        self, receive: Receive, send: Send, instance: ASGIInstance
+    ) -> None:
+        token = current_json_codec.set(self.json_codec)
+        try:
+            await instance(receive, send)
+        finally:
+            current_json_codec.reset(token)
+
+    async def without_body(
+        self, receive: Receive, send: Send, instance: ASGIInstance
+    ) -> None:
+        # HEAD answers of every route, handler and middleware keep only headers
+        async def send_headers(message: Message) -> None:
+            if message["type"] in (
+                "http.response.body",
+                "http.response.pathsend",
+                "http.response.zerocopysend",
+            ):
+                if message.get("more_body", False):
+                    return
+                message = {"type": "http.response.body", "body": b""}
+            await send(message)
+
+        await instance(receive, send_headers)
@@ -1,5 +1,7 @@
 import asyncio
 import functools
+import threading
+import time
 import typing
 
 try:
@@ -21,3 +23,75 @@ async def run_in_threadpool(
         func = functools.partial(func, **kwargs)
 
     return await _loop.run_in_executor(None, func, *args)
+
+
+def _next_batch(
+    iterator: typing.Iterator,
+    batch_size: int,
+    batch_delay: float,
+    lock: threading.Lock,
+) -> typing.Tuple[typing.List[typing.Any], bool]:
+    batch = []
+    deadline = None
+    with lock:
+        for item in iterator:
+            batch.append(item)
+            if len(batch) == batch_size:
+                return batch, False
+            now = time.monotonic()
+            if deadline is None:
+                deadline = now + batch_delay
+            elif now >= deadline:
+                return batch, False
+    return batch, True
+
+
+def _close(iterator: typing.Iterator, lock: threading.Lock) -> None:
+    close = getattr(iterator, "close", None)
+    if close is not None:
+        # waits for a batch still being pulled by a cancelled producer
+        with lock:
+            close()
+
+
+async def iterate_in_threadpool(
+    iterator: typing.Iterator,
+    batch_size: int = 64,
+    prefetch: int = 2,
+    batch_delay: float = 0.005,
+) -> typing.AsyncGenerator[typing.Any, None]:
+    """
+    pulls a blocking iterator in the threadpool, `batch_size` items per
+    thread hop, at most `prefetch` batches are buffered ahead of the consumer,
+    so a slow consumer throttles the producer.
+    a batch is also handed over once `batch_delay` seconds have passed since
+    its first item, checked as each item arrives, so a slow iterator holds
+    an item back for at most one item interval, use `batch_size=1` when
+    every item must go out as soon as it is produced.
+    """
+    queue = asyncio.Queue(maxsize=prefetch)  # type: asyncio.Queue
+    lock = threading.Lock()
+
+    async def produce() -> None:
+        try:
+            done = False
+            while not done:
+                batch, done = await run_in_threadpool(
+                    _next_batch, iterator, batch_size, batch_delay, lock
+                )
+                await queue.put((batch, done, None))
+        except Exception as exc:
+            await queue.put(([], True, exc))
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        done = False
+        while not done:
+            batch, done, exc = await queue.get()
+            if exc is not None:
+                raise exc
+            for item in batch:
+                yield item
+    finally:
+        producer.cancel()
+        await run_in_threadpool(_close, iterator, lock)
@@ -1,3 +1,6 @@
+import contextvars
+import json
+import math
 import os
 import typing
 from collections.abc import MutableMapping
@@ -125,3 +128,115 @@ class Config(object):
                 f'Config "{key}" has value "{value}". '
                 f"But not a valid {cast.__name__}"
             )
+
+
+def _json_dumps(content: typing.Any) -> bytes:
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def _has_non_finite(content: typing.Any) -> bool:
+    if isinstance(content, float):
+        return not math.isfinite(content)
+    if isinstance(content, dict):
+        content = content.values()
+    elif not isinstance(content, (list, tuple)):
+        return False
+    return any(_has_non_finite(item) for item in content)
+
+
+def _orjson_backend() -> typing.Tuple[typing.Callable, typing.Callable]:
+    import orjson
+
+    def dumps(content: typing.Any) -> bytes:
+        try:
+            data = orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # e.g. integers wider than 64 bits
+            return _json_dumps(content)
+        # orjson writes nan and infinity as null
+        if b"null" in data and _has_non_finite(content):
+            return _json_dumps(content)
+        return data
+
+    return dumps, orjson.loads
+
+
+def _ujson_backend() -> typing.Tuple[typing.Callable, typing.Callable]:
+    import ujson
+
+    def dumps(content: typing.Any) -> bytes:
+        try:
+            data = ujson.dumps(
+                content,
+                ensure_ascii=False,
+                escape_forward_slashes=False,
+                allow_nan=False,
+            )
+        except OverflowError:
+            return _json_dumps(content)
+        return data.encode("utf-8")
+
+    return dumps, ujson.loads
+
+
+def _json_backend() -> typing.Tuple[typing.Callable, typing.Callable]:
+    return _json_dumps, json.loads
+
+
+class JSONCodec(object):
+    """
+    json backend shared by responses, requests, websockets and plugins,
+    `dumps` always returns compact utf-8 bytes, `loads` accepts str or bytes.
+    by default the fastest installed backend is used: orjson, ujson, json.
+
+    every backend's `dumps` raises ValueError on nan and infinity and falls
+    back to json for values the backend rejects, such as integers wider
+    than 64 bits for orjson. remaining differences: orjson serializes
+    dataclasses, datetimes and uuids json would reject, orjson `loads`
+    refuses NaN/Infinity tokens and reads integers wider than 64 bits as
+    floats.
+    """
+
+    backends = {
+        "orjson": _orjson_backend,
+        "ujson": _ujson_backend,
+        "json": _json_backend,
+    }  # type: typing.Dict[str, typing.Callable]
+
+    def __init__(self, name: str = None) -> None:
+        self.use(name)
+
+    def available(self) -> typing.List[str]:
+        names = []
+        for name, backend in self.backends.items():
+            try:
+                backend()
+            except ImportError:
+                continue
+            names.append(name)
+        return names
+
+    def use(self, name: str = None) -> None:
+        if name is None:
+            name = self.available()[0]
+        assert name in self.backends, f"Unknown json codec `{name}`"
+        self.dumps, self.loads = self.backends[name]()
+        self.name = name
+
+
+json_codec = JSONCodec()
+current_json_codec = contextvars.ContextVar(
+    "json_codec", default=None
+)  # type: contextvars.ContextVar
+
+
+def get_json_codec() -> JSONCodec:
+    """codec of the running app, see `Yast(json_codec=...)`, or `json_codec`"""
+    codec = current_json_codec.get()
+    return json_codec if codec is None else codec
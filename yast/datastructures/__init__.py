@@ -1,11 +1,13 @@
 __all__ = [
     "Address",
     "CommaSeparatedStrings",
+    "dump_cookie",
     "DatabaseURL",
     "FormData",
     "FormValue",
     "Headers",
     "MutableHeaders",
+    "parse_cookie",
     "QueryParams",
     "Secret",
     "UploadFile",
@@ -14,6 +16,7 @@ __all__ = [
 ]
 
 
+from .cookies import dump_cookie, parse_cookie
 from .form import FormData, FormValue, UploadFile
 from .headers import Headers, MutableHeaders
 from .urls import (
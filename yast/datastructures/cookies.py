@@ -0,0 +1,77 @@
+import functools
+import http.cookies
+import time
+import typing
+from email.utils import formatdate
+
+
+def parse_cookie(cookie_string: str) -> typing.Dict[str, str]:
+    """
+    parse a `Cookie` request header the way browsers send it, `name=value`
+    pairs split on `;`, later pairs override earlier ones with the same name
+    """
+    cookies = {}
+    for chunk in cookie_string.split(";"):
+        if "=" in chunk:
+            key, value = chunk.split("=", 1)
+            key, value = key.strip(), value.strip()
+        else:
+            key, value = "", chunk.strip()
+        if key or value:
+            if value[:1] == '"':
+                value = http.cookies._unquote(value)
+            cookies[key] = value
+    return cookies
+
+
+@functools.lru_cache(maxsize=128)
+def _cookie_attributes(
+    max_age: typing.Any,
+    path: typing.Optional[str],
+    domain: typing.Optional[str],
+    secure: bool,
+    httponly: bool,
+) -> typing.Tuple[str, str]:
+    # attributes before and after `expires`, in the order SimpleCookie uses
+    before = f"; Domain={domain}" if domain else ""
+    after = ""
+    if httponly:
+        after += "; HttpOnly"
+    if max_age is not None and max_age != "":
+        if isinstance(max_age, int):
+            after += "; Max-Age=%d" % max_age
+        else:
+            after += f"; Max-Age={max_age}"
+    if path:
+        after += f"; Path={path}"
+    if secure:
+        after += "; Secure"
+    return before, after
+
+
+def dump_cookie(
+    key: str,
+    value: str = "",
+    max_age: typing.Union[int, str] = None,
+    expires: typing.Union[int, str] = None,
+    path: str = None,
+    domain: str = None,
+    secure: bool = False,
+    httponly: bool = False,
+) -> str:
+    """
+    build a `Set-Cookie` header value, same output as `SimpleCookie`,
+    an int `expires` is the number of seconds from now
+    """
+    if key.lower() in http.cookies.Morsel._reserved:
+        raise http.cookies.CookieError(f"Attempt to set a reserved key {key!r}")
+    if not http.cookies._is_legal_key(key):
+        raise http.cookies.CookieError(f"Illegal key {key!r}")
+
+    before, after = _cookie_attributes(max_age, path, domain, secure, httponly)
+    cookie = f"{key}={http.cookies._quote(str(value))}{before}"
+    if isinstance(expires, int):
+        cookie += "; expires=" + formatdate(time.time() + expires, usegmt=True)
+    elif expires:
+        cookie += f"; expires={expires}"
+    return cookie + after
@@ -4,7 +4,13 @@ from yast.types import Scope
 
 
 class Headers(typing.Mapping[str, str]):
-    """headers"""
+    """
+    headers, backed by the raw `(key, value)` byte pairs, lookups go through
+    a lowercase key index that is built on first use, and rebuilt when the
+    raw list has been changed from outside (its size or last item differs).
+    """
+
+    __slots__ = ("_list", "_index", "_index_size", "_index_last")
 
     def __init__(
         self,
@@ -13,6 +19,9 @@ class Headers(typing.Mapping[str, str]):
         scope: Scope = None,
     ) -> None:
         self._list = []
+        self._index = None  # type: typing.Optional[typing.Dict[str, typing.List[int]]]
+        self._index_size = 0
+        self._index_last = None  # type: typing.Optional[typing.Tuple[bytes, bytes]]
         if headers is not None:
             assert raw is None, "Cannot set both `headers` and `raw`"
             assert scope is None, "Cannot set both `headers` and `scope`"
@@ -30,6 +39,28 @@ class Headers(typing.Mapping[str, str]):
     def raw(self) -> typing.List[typing.Tuple[bytes, bytes]]:
         return list(self._list)
 
+    def _index_valid(self) -> bool:
+        raw = self._list
+        return (
+            self._index is not None
+            and self._index_size == len(raw)
+            and (not raw or raw[-1] is self._index_last)
+        )
+
+    def _positions(self, key: str) -> typing.List[int]:
+        if not self._index_valid():
+            index = {}  # type: typing.Dict[str, typing.List[int]]
+            for idx, (ik, _) in enumerate(self._list):
+                h_k = ik.decode("latin-1")
+                if h_k in index:
+                    index[h_k].append(idx)
+                else:
+                    index[h_k] = [idx]
+            self._index = index
+            self._index_size = len(self._list)
+            self._index_last = self._list[-1] if self._list else None
+        return self._index.get(key.lower(), [])
+
     def keys(self):
         return [key.decode("latin-1") for key, _ in self._list]
 
@@ -46,22 +77,20 @@ class Headers(typing.Mapping[str, str]):
             return default
 
     def getlist(self, key: str) -> typing.List[str]:
-        h_k = key.lower().encode("latin-1")
-        return [iv.decode("latin-1") for ik, iv in self._list if ik == h_k]
+        raw = self._list
+        return [raw[idx][1].decode("latin-1") for idx in self._positions(key)]
 
     def mutablecopy(self):
         return MutableHeaders(raw=self._list[:])
 
     def __getitem__(self, key: str):
-        h_k = key.lower().encode("latin-1")
-        for ik, iv in self._list:
-            if h_k == ik:
-                return iv.decode("latin-1")
-
-        raise KeyError(key)
+        positions = self._positions(key)
+        if not positions:
+            raise KeyError(key)
+        return self._list[positions[0]][1].decode("latin-1")
 
     def __contains__(self, key: str):
-        return key.lower() in self.keys()
+        return bool(self._positions(key))
 
     def __iter__(self):
         return iter(self.keys())
@@ -82,49 +111,47 @@ class Headers(typing.Mapping[str, str]):
 
 
 class MutableHeaders(Headers):
+    __slots__ = ()
+
     def __setitem__(self, key: str, value: str):
         set_key = key.lower().encode("latin-1")
         set_value = value.encode("latin-1")
 
-        pop_indexes = []
-        for idx, (ik, _) in enumerate(self._list):
-            if ik == set_key:
-                pop_indexes.append(idx)
+        pop_indexes = self._positions(key)
+        if not pop_indexes:
+            self.append(key, value)
+            return
 
         """
         retain insertion order .
         """
-        for idx in reversed(pop_indexes[1:]):
-            del self._list[idx]
-
-        if pop_indexes:
-            self._list[pop_indexes[0]] = (set_key, set_value)
-        else:
-            self._list.append((set_key, set_value))
+        item = (set_key, set_value)
+        self._list[pop_indexes[0]] = item
+        if pop_indexes[0] == len(self._list) - 1:
+            self._index_last = item
+        if len(pop_indexes) > 1:
+            for idx in reversed(pop_indexes[1:]):
+                del self._list[idx]
+            self._index = None
 
     def __delitem__(self, key: str):
-        del_key = key.lower().encode("latin-1")
-        pop_indexes = []
-        for idx, (ik, _) in enumerate(self._list):
-            if ik == del_key:
-                pop_indexes.append(idx)
-
-        for idx in reversed(pop_indexes):
-            del self._list[idx]
+        pop_indexes = self._positions(key)
+        if pop_indexes:
+            for idx in reversed(pop_indexes):
+                del self._list[idx]
+            self._index = None
 
     @property
     def raw(self) -> typing.List[typing.Tuple[bytes, bytes]]:
+        self._index = None  # the live list may be edited in place
         return self._list
 
     def setdefault(self, key: str, value: str):
-        set_key = key.lower().encode("latin-1")
-        set_value = value.encode("latin-1")
-
-        for _, (itm_key, itm_val) in enumerate(self._list):
-            if itm_key == set_key:
-                return itm_val.decode("latin-1")
+        positions = self._positions(key)
+        if positions:
+            return self._list[positions[0]][1].decode("latin-1")
 
-        self._list.append((set_key, set_value))
+        self.append(key, value)
         return value
 
     def update(self, other: dict):
@@ -132,9 +159,13 @@ class MutableHeaders(Headers):
             self[key] = val
 
     def append(self, key: str, value: str) -> None:
-        app_key = key.lower().encode("latin-1")
-        app_val = value.encode("latin-1")
-        self._list.append((app_key, app_val))
+        app_key = key.lower()
+        item = (app_key.encode("latin-1"), value.encode("latin-1"))
+        if self._index_valid():
+            self._index.setdefault(app_key, []).append(len(self._list))
+            self._index_size += 1
+            self._index_last = item
+        self._list.append(item)
 
     def add_vary_header(self, vary):
         existing = self.get("vary")
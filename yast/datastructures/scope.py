@@ -0,0 +1,78 @@
+"""
+per request parse cache, kept in the scope so every middleware and the
+endpoint share the parsed headers, url, query params and cookies.
+child scopes are shallow copies that share the cache, so each entry is
+stored along with the scope values it was parsed from and is reparsed
+when those values differ.
+"""
+
+import typing
+
+from yast.types import Scope
+
+from .cookies import parse_cookie
+from .headers import Headers
+from .urls import URL, QueryParams
+
+SCOPE_CACHE_KEY = "yast.parsed"
+
+
+def _scope_cache(scope: Scope) -> typing.Dict[str, typing.Any]:
+    cache = scope.get(SCOPE_CACHE_KEY)
+    if cache is None:
+        cache = scope[SCOPE_CACHE_KEY] = {}
+    return cache
+
+
+def scope_headers(scope: Scope) -> Headers:
+    cache = _scope_cache(scope)
+    raw = scope.get("headers", [])
+    cached = cache.get("headers")
+    if cached is None or cached[0] is not raw:
+        cached = cache["headers"] = (raw, Headers(raw=raw))
+    return cached[1]
+
+
+def scope_host(scope: Scope) -> str:
+    """the `host` header without its port"""
+    cache = _scope_cache(scope)
+    host_header = scope_headers(scope).get("host", "")
+    cached = cache.get("host")
+    if cached is None or cached[0] != host_header:
+        cached = cache["host"] = (host_header, host_header.split(":")[0])
+    return cached[1]
+
+
+def scope_url(scope: Scope) -> URL:
+    cache = _scope_cache(scope)
+    key = (
+        scope.get("scheme"),
+        scope.get("server"),
+        scope.get("root_path"),
+        scope["path"],
+        scope["query_string"],
+        scope_headers(scope).get("host"),
+    )
+    cached = cache.get("url")
+    if cached is None or cached[0] != key:
+        cached = cache["url"] = (key, URL(scope=scope))
+    return cached[1]
+
+
+def scope_query_params(scope: Scope) -> QueryParams:
+    cache = _scope_cache(scope)
+    query_string = scope["query_string"]
+    cached = cache.get("query_params")
+    if cached is None or cached[0] != query_string:
+        cached = cache["query_params"] = (query_string, QueryParams(query_string))
+    return cached[1]
+
+
+def scope_cookies(scope: Scope) -> typing.Dict[str, str]:
+    cache = _scope_cache(scope)
+    cookie_headers = scope_headers(scope).get("cookie")
+    cached = cache.get("cookies")
+    if cached is None or cached[0] != cookie_headers:
+        cookies = parse_cookie(cookie_headers) if cookie_headers else {}
+        cached = cache["cookies"] = (cookie_headers, cookies)
+    return cached[1]
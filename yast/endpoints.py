@@ -1,25 +1,39 @@
 import asyncio
 import typing
 
-import ujson as json
-
 import yast.status as status
 from yast.concurrency import run_in_threadpool
+from yast.config import get_json_codec
 from yast.exceptions import HttpException
-from yast.requests import Request
-from yast.responses import PlainTextResponse, Response
+from yast.requests import ClientDisconnect, Request
+from yast.responses import PlainTextResponse, PreparedResponse, Response
 from yast.types import Message, Receive, Scope, Send
 from yast.websockets import WebSocket
 
 
 class HttpEndPoint(object):
+    # expose `req.disconnected`, and optionally cancel the handler on disconnect
+    watch_disconnect = False
+    cancel_on_disconnect = False
+
     def __init__(self, scope: Scope) -> None:
         assert scope["type"] == "http"
         self.scope = scope
 
     async def __call__(self, receive: Receive, send: Send) -> None:
         req = Request(self.scope, receive)
-        res = await self.dispatch(req)
+        if self.watch_disconnect or self.cancel_on_disconnect:
+            try:
+                res = await req.watch_disconnect(
+                    self.dispatch(req), cancel=self.cancel_on_disconnect
+                )
+            except ClientDisconnect:
+                return
+        else:
+            res = await self.dispatch(req)
+
+        if isinstance(res, (Response, PreparedResponse)):
+            res = res.for_scope(self.scope)
 
         await res(receive, send)
 
@@ -102,10 +116,10 @@ class WebSocketEndpoint(object):
     async def _decode_json(self, message: Message):
         try:
             if "text" in message:
-                msg_json = json.loads(message["text"])
+                msg_json = get_json_codec().loads(message["text"])
             elif "bytes" in message:
-                msg_json = json.loads(message["bytes"].decode("utf-8"))
-        except json.decoder.JSONDecodeError:
+                msg_json = get_json_codec().loads(message["bytes"])
+        except ValueError:
             await self.ws.close(code=status.WS_1003_UNSUPPORTED_DATA)
             raise RuntimeError("Malformed JSON data received.")
         else:
@@ -1,4 +1,6 @@
+import codecs
 import enum
+import json
 import typing
 from urllib.parse import unquote_plus
 
@@ -187,3 +189,145 @@ class MultiPartParser(object):
         parser.finalize()
 
         return FormData(items=items)
+
+
+class JSONItemsParser(object):
+    """
+    incremental json parser, yields the values found at `prefix` while the
+    body is still being received, e.g. `item` for the elements of a top
+    level array, `data.item` for the elements of the array at key `data`.
+    only one value is buffered at a time, values not on the prefix are
+    decoded and dropped.
+    """
+
+    WHITESPACE = " \t\n\r"
+
+    def __init__(
+        self,
+        stream: typing.Callable[[], typing.AsyncGenerator[bytes, None]] = None,
+        prefix: str = "item",
+    ) -> None:
+        self.stream = stream
+        self.path = prefix.split(".") if prefix else []
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.retry_size = 0
+        # [kind, level, expect, key]
+        self.frames = []  # type: typing.List[list]
+        self.level = 0  # type: typing.Optional[int]
+        self.state = "value"
+
+    async def parse(self) -> typing.AsyncGenerator[typing.Any, None]:
+        text_decoder = codecs.getincrementaldecoder("utf-8")()
+        async for chunk in self.stream():
+            text = text_decoder.decode(chunk, final=not chunk)
+            for item in self.feed(text, eof=not chunk):
+                yield item
+
+    def feed(self, text: str, eof: bool = False) -> typing.List[typing.Any]:
+        self.buffer = self.buffer[self.pos :] + text
+        self.pos = 0
+
+        items = []
+        while self.advance(items, eof):
+            pass
+
+        if eof and self.state != "done":
+            raise json.JSONDecodeError("Unexpected end of data", self.buffer, self.pos)
+        return items
+
+    def advance(self, items: typing.List[typing.Any], eof: bool) -> bool:
+        buffer = self.buffer
+        pos = self.pos
+        while pos < len(buffer) and buffer[pos] in self.WHITESPACE:
+            pos += 1
+        self.pos = pos
+
+        if pos == len(buffer):
+            return False
+        char = buffer[pos]
+        if self.state == "done":
+            raise json.JSONDecodeError("Extra data", buffer, pos)
+
+        if self.state == "value":
+            level = self.level
+            if level is None or level == len(self.path):
+                value, end = self.decode(eof)
+                if end is None:
+                    return False
+                if level is not None:
+                    items.append(value)
+                self.pos = end
+                self.value_done()
+                return True
+
+            kind = "array" if self.path[level] == "item" else "object"
+            if char != {"array": "[", "object": "{"}[kind]:
+                self.level = None
+                return True
+
+            self.pos = pos + 1
+            self.frames.append([kind, level, "first", None])
+            self.state = "container"
+            return True
+
+        frame = self.frames[-1]
+        kind, level, expect, _ = frame
+        if char == {"array": "]", "object": "}"}[kind] and expect in ("first", "next"):
+            self.pos = pos + 1
+            self.frames.pop()
+            self.value_done()
+            return True
+
+        if expect == "next":
+            if char != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+            self.pos = pos + 1
+            frame[2] = "item"
+        elif kind == "array":
+            frame[2] = "next"
+            self.level = level + 1
+            self.state = "value"
+        elif expect in ("first", "item"):
+            key, end = self.decode(eof)
+            if end is None:
+                return False
+            if not isinstance(key, str):
+                raise json.JSONDecodeError("Expecting property name", buffer, pos)
+            self.pos = end
+            frame[2] = "colon"
+            frame[3] = key
+        else:
+            if char != ":":
+                raise json.JSONDecodeError("Expecting ':' delimiter", buffer, pos)
+            self.pos = pos + 1
+            frame[2] = "next"
+            self.level = level + 1 if frame[3] == self.path[level] else None
+            self.state = "value"
+        return True
+
+    def decode(self, eof: bool) -> typing.Tuple[typing.Any, typing.Optional[int]]:
+        buffer, pos = self.buffer, self.pos
+        if not eof and len(buffer) - pos < self.retry_size:
+            return None, None
+
+        try:
+            value, end = self.decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # wait until the pending value has doubled before decoding again
+            self.retry_size = 2 * (len(buffer) - pos)
+            return None, None
+
+        if not eof and buffer[pos] in "-0123456789":
+            # a number at the end of the buffer may not be complete yet
+            if end == len(buffer) or buffer[end] in ".eE+-":
+                return None, None
+
+        self.retry_size = 0
+        return value, end
+
+    def value_done(self) -> None:
+        self.state = "container" if self.frames else "done"
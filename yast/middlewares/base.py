@@ -11,6 +11,8 @@ RequestResponseEndpoint = typing.Callable[[Request], typing.Awaitable[ASGIInstan
 DispatchFunction = typing.Callable[
     [Request, RequestResponseEndpoint], typing.Awaitable[ASGIInstance]
 ]
+# messages the body stream below cannot carry
+SEND_EXTENSIONS = ("http.response.pathsend", "http.response.zerocopysend")
 
 
 class BaseHttpMiddleware(Middleware):
@@ -30,7 +32,15 @@ class BaseHttpMiddleware(Middleware):
         await res(receive, send)
 
     async def call_next(self, req: Request) -> ASGIInstance:
-        inner = self.app(dict(req))
+        scope = dict(req)
+        extensions = scope.get("extensions")
+        if extensions and any(name in extensions for name in SEND_EXTENSIONS):
+            scope["extensions"] = {
+                name: value
+                for name, value in extensions.items()
+                if name not in SEND_EXTENSIONS
+            }
+        inner = self.app(scope)
 
         loop = asyncio.get_event_loop()
         queue = asyncio.Queue()
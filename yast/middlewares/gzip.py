@@ -1,7 +1,8 @@
 import gzip
 import io
 
-from yast.datastructures import Headers, MutableHeaders
+from yast.datastructures import MutableHeaders
+from yast.datastructures.scope import scope_headers
 from yast.types import ASGIApp, ASGIInstance, Message, Receive, Scope, Send
 
 
@@ -12,7 +13,7 @@ class GZipMiddleware(object):
 
     def __call__(self, scope: Scope) -> ASGIInstance:
         if scope["type"] == "http":
-            headers = Headers(scope=scope)
+            headers = scope_headers(scope)
             if "gzip" in headers.get("Accept-Encoding", ""):
                 return GZipResponder(self.app, scope, self.minimum_size)
         return self.app(scope)
@@ -25,6 +26,7 @@ class GZipResponder(object):
         self.send = unattached_send
         self.init_message = {}
         self.started = False
+        self.passthrough = False
         self.gzip_buffer = io.BytesIO()
         self.gzip_file = gzip.GzipFile(mode="wb", fileobj=self.gzip_buffer)
 
@@ -35,6 +37,16 @@ class GZipResponder(object):
     async def _send(self, message: Message):
         if message["type"] == "http.response.start":
             self.init_message = message
+        elif self.passthrough:
+            await self.send(message)
+        elif not self.started and (
+            message["type"] != "http.response.body"
+            or b"content-encoding" in (key for key, _ in self.init_message["headers"])
+        ):
+            # already encoded, or a file sent by the server itself
+            self.started = self.passthrough = True
+            await self.send(self.init_message)
+            await self.send(message)
         elif message["type"] == "http.response.body":
             if not self.started:
                 self.started = True
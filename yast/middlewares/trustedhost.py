@@ -1,6 +1,6 @@
 import typing
 
-from yast.datastructures import URL, Headers
+from yast.datastructures.scope import scope_headers, scope_url
 from yast.responses import PlainTextResponse, RedirectResponse, Response
 from yast.types import ASGIApp, Scope
 
@@ -25,7 +25,7 @@ class TrustedHostMiddleware(object):
 
     def __call__(self, scope: Scope) -> Response:
         if scope["type"] in ("http", "websocket") and not self.allow_any:
-            headers = Headers(scope=scope)
+            headers = scope_headers(scope)
             host = headers.get("host", "").split(":")[0]
             found_www_redirect = False
             for pattern in self.allowed_hosts:
@@ -39,7 +39,7 @@ class TrustedHostMiddleware(object):
                     found_www_redirect = True
             else:
                 if found_www_redirect and self.www_redirect:
-                    url = URL(scope=scope)
+                    url = scope_url(scope)
                     redirect_url = url.replace(netloc="www." + url.netloc)
                     return RedirectResponse(url=str(redirect_url))
                 return PlainTextResponse("Invalid host header", status_code=400)
@@ -7,7 +7,7 @@ from yast.concurrency import run_in_threadpool
 from yast.types import ASGIApp, ASGIInstance, Receive, Scope, Send
 
 
-def build_environ(scope: Scope, body: bytes) -> dict:
+def build_environ(scope: Scope, body: typing.Union[bytes, typing.IO]) -> dict:
     environ = {
         "REQUEST_METHOD": scope["method"],
         "SCRIPT_NAME": scope.get("root_path", ""),
@@ -16,7 +16,7 @@ def build_environ(scope: Scope, body: bytes) -> dict:
         "SERVER_PROTOCOL": "HTTP/%s" % scope["http_version"],
         "wsgi.version": (1, 0),
         "wsgi.url_scheme": scope.get("scheme", "http"),
-        "wsgi.input": io.BytesIO(body),
+        "wsgi.input": body if hasattr(body, "read") else io.BytesIO(body),
         "wsgi.errors": sys.stdout,
         "wsgi.multithread": True,
         "wsgi.multiprocess": True,
@@ -71,12 +71,13 @@ class WSGIResponser(object):
         self._running = True
 
     async def __call__(self, receive: Receive, send: Send) -> None:
-        body = b""
+        body = io.BytesIO()
         more_body = True
         while more_body:
             message = await receive()
-            body += message.get("body", b"")
+            body.write(message.get("body", b""))
             more_body = message.get("more_body", False)
+        body.seek(0)
 
         environ = build_environ(self.scope, body)
         wsgi = run_in_threadpool(self.wsgi, environ, self.start_response)
@@ -1,8 +1,6 @@
 import functools
 import typing
 
-import ujson as json
-
 try:
     import graphene
     from graphql.error import GraphQLError, format_error as format_graphql_error
@@ -16,6 +14,7 @@ except ImportError:  # pragma: no cover
 import yast.status as web_status
 from yast.background import BackgroundTasks
 from yast.concurrency import run_in_threadpool
+from yast.config import get_json_codec
 from yast.requests import Request
 from yast.responses import (
     HTMLResponse,
@@ -108,7 +107,9 @@ class GraphQLApp(object):
         return JSONResponse(res_data, status_code=status_code)
 
     async def handle_graphiql(self, req: Request) -> Response:
-        text = GRAPHIQL.replace("{{REQUEST_PATH}}", json.dumps(req.url.path))
+        path = get_json_codec().dumps(req.url.path).decode("utf-8")
+        path = path.replace("</", "<\\/")
+        text = GRAPHIQL.replace("{{REQUEST_PATH}}", path)
         return HTMLResponse(text)
 
     async def execute(
@@ -2,7 +2,8 @@ import functools
 import re
 import typing
 
-from yast.datastructures import Headers, MutableHeaders
+from yast.datastructures import MutableHeaders
+from yast.datastructures.scope import scope_headers
 from yast.responses import PlainTextResponse, Response
 from yast.types import ASGIApp, Message, Receive, Scope, Send
 
@@ -79,7 +80,7 @@ class CORSMiddleware(object):
     def __call__(self, scope: Scope) -> Response:
         if scope["type"] == "http":
             method = scope["method"]
-            headers = Headers(scope=scope)
+            headers = scope_headers(scope)
             origin = headers.get("origin")
 
             if origin is not None:
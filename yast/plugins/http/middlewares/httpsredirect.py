@@ -1,4 +1,4 @@
-from yast.datastructures import URL
+from yast.datastructures.scope import scope_url
 from yast.middlewares.core import Middleware
 from yast.responses import RedirectResponse, Response
 from yast.types import ASGIApp
@@ -10,7 +10,7 @@ class HttpsRedirectMiddleware(Middleware):
 
     def __call__(self, scope) -> Response:
         if scope["type"] in ("http", "websocket") and scope["scheme"] in ("http", "ws"):
-            url = URL(scope=scope)
+            url = scope_url(scope)
             redirect_scheme = {"http": "https", "ws": "wss"}[scope["scheme"]]
             netloc = url.hostname if url.port in (80, 443) else url.netloc
             url = url.replace(scheme=redirect_scheme, netloc=netloc)
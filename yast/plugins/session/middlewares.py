@@ -2,9 +2,9 @@ import functools
 from base64 import b64decode, b64encode
 
 import itsdangerous
-import ujson as json
 from itsdangerous.exc import BadTimeSignature, SignatureExpired
 
+from yast.config import get_json_codec
 from yast.datastructures import MutableHeaders
 from yast.requests import Request
 from yast.types import ASGIApp, ASGIInstance, Message, Receive, Scope, Send
@@ -35,7 +35,7 @@ class SessionMiddleware(object):
                 data = req.cookie[self.session_cookie].encode("utf-8")
                 try:
                     data = self.signer.unsign(data, max_age=self.max_age)
-                    scope["session"] = json.loads(b64decode(data))
+                    scope["session"] = get_json_codec().loads(b64decode(data))
                 except (BadTimeSignature, SignatureExpired):
                     scope["session"] = {}
             else:
@@ -51,7 +51,7 @@ class SessionMiddleware(object):
         async def sender(message: Message) -> None:
             if message["type"] == "http.response.start":
                 if scope["session"]:
-                    data = b64encode(json.dumps(scope["session"]).encode())
+                    data = b64encode(get_json_codec().dumps(scope["session"]))
                     data = self.signer.sign(data)
                     headers = MutableHeaders(scope=message)
                     header_value = "%s=%s; path=/; Max-Age=%d; %s" % (
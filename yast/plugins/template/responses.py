@@ -86,12 +86,14 @@ class Jinja2Template(object):
         self,
         name: str,
         request: Request,
-        context: dict = {},
+        context: dict = None,
         status_code: int = 200,
         headers: dict = None,
         media_type: str = None,
         background: BackgroundTask = None,
     ) -> TemplateResponse:
+        if context is None:
+            context = {}
         if "request" not in context:
             context["request"] = request
         template = self.get_template(name)
@@ -1,14 +1,22 @@
 import asyncio
-import http.cookies
-import json
+import tempfile
 import typing
 import warnings
 from collections.abc import Mapping
 from typing import Iterator
 from urllib.parse import unquote
 
+from yast.concurrency import run_in_threadpool
+from yast.config import get_json_codec
 from yast.datastructures import URL, Address, FormData, Headers, QueryParams
-from yast.formparsers import FormParser, MultiPartParser
+from yast.datastructures.scope import (
+    scope_cookies,
+    scope_headers,
+    scope_query_params,
+    scope_url,
+)
+from yast.exceptions import HttpException
+from yast.formparsers import FormParser, JSONItemsParser, MultiPartParser
 from yast.types import Message, Receive, Scope
 
 try:
@@ -40,9 +48,7 @@ class HttpConnection(Mapping):
 
     @property
     def url(self) -> URL:
-        if not hasattr(self, "_url"):
-            self._url = URL(scope=self._scope)
-        return self._url
+        return scope_url(self._scope)
 
     @property
     def app(self) -> typing.Any:
@@ -50,15 +56,11 @@ class HttpConnection(Mapping):
 
     @property
     def headers(self) -> Headers:
-        if not hasattr(self, "_headers"):
-            self._headers = Headers(scope=self._scope)
-        return self._headers
+        return scope_headers(self._scope)
 
     @property
     def query_params(self) -> QueryParams:
-        if not hasattr(self, "_query_params"):
-            self._query_params = QueryParams(self._scope["query_string"])
-        return self._query_params
+        return scope_query_params(self._scope)
 
     @property
     def path_params(self) -> dict:
@@ -66,16 +68,7 @@ class HttpConnection(Mapping):
 
     @property
     def cookie(self) -> typing.Dict[str, str]:
-        if not hasattr(self, "_cookies"):
-            cookies = {}
-            cookie_headers = self.headers.get("cookie")
-            if cookie_headers:
-                cookie = http.cookies.SimpleCookie()
-                cookie.load(cookie_headers)
-                for k, morse in cookie.items():
-                    cookies[k] = morse.value
-            self._cookies = cookies
-        return self._cookies
+        return scope_cookies(self._scope)
 
     @property
     def client(self) -> Address:
@@ -128,12 +121,82 @@ class ClientDisconnect(Exception):
     pass
 
 
+class DisconnectWatcher(object):
+    """
+    reads the receive channel in the background, body messages are handed
+    over to the request through a small queue, `http.disconnect` marks the
+    request as disconnected and cancels `task` if one is given.
+    """
+
+    def __init__(self, request: "Request", task: asyncio.Future = None) -> None:
+        self.request = request
+        self.task = task
+        self.channel = request.receive
+        self.messages = asyncio.Queue(maxsize=4)  # type: asyncio.Queue
+        self.disconnect = None  # type: typing.Optional[Message]
+        request.set_receive_channel(self.receive)
+        request._watcher = self
+        self.watcher = asyncio.ensure_future(self.watch())
+
+    async def watch(self) -> None:
+        while True:
+            message = await self.channel()
+            if message["type"] == "http.disconnect":
+                self.disconnect = message
+                if not self.messages.full():
+                    self.messages.put_nowait(message)
+                self.request._set_disconnected()
+                if self.task is not None:
+                    self.task.cancel()
+                return
+            await self.messages.put(message)
+
+    async def receive(self) -> Message:
+        if not self.messages.empty():
+            return self.messages.get_nowait()
+        if self.disconnect is not None:
+            return self.disconnect
+        if self.watcher.done():
+            return await self.channel()
+        return await self.messages.get()
+
+    def stop(self) -> None:
+        self.watcher.cancel()
+        if self.request._watcher is self:
+            self.request._watcher = None
+        if self.messages.empty() and self.disconnect is None:
+            self.request.set_receive_channel(self.channel)
+
+
 class Request(HttpConnection):
-    def __init__(self, scope: Scope, receive: Receive = None):
+    # bytes, `None` means unlimited, a larger body raises http 413,
+    # defaults to the app's `Yast(max_body_size=...)`
+    max_body_size = None  # type: typing.Optional[int]
+    # bytes kept in memory by `body_file` before spilling to disk
+    spool_max_size = 1024 * 1024
+    # bytes per threadpool write to, or read from, the `body_file`
+    spool_chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        scope: Scope,
+        receive: Receive = None,
+        max_body_size: int = None,
+        spool_max_size: int = None,
+    ):
         super().__init__(scope=scope)
         self._receive = empty_receive if receive is None else receive
         self._stream_consumed = False
         self._is_disconnected = False
+        self._disconnected = None  # type: typing.Optional[asyncio.Event]
+        self._watcher = None  # type: typing.Optional[DisconnectWatcher]
+        if max_body_size is None:
+            app_config = getattr(scope.get("app"), "config", None) or {}
+            max_body_size = app_config.get("max_body_size")
+        if max_body_size is not None:
+            self.max_body_size = max_body_size
+        if spool_max_size is not None:
+            self.spool_max_size = spool_max_size
 
     def set_receive_channel(self, receive: Receive) -> None:
         self._receive = receive
@@ -159,44 +222,138 @@ class Request(HttpConnection):
     def receive(self):
         return self._receive
 
+    @property
+    def disconnected(self) -> asyncio.Event:
+        """set once `http.disconnect` has been received"""
+        if self._disconnected is None:
+            self._disconnected = asyncio.Event()
+            if self._is_disconnected:
+                self._disconnected.set()
+        return self._disconnected
+
+    @property
+    def watching(self) -> bool:
+        """a `DisconnectWatcher` is reading the receive channel"""
+        return self._watcher is not None
+
+    def _set_disconnected(self) -> None:
+        self._is_disconnected = True
+        if self._disconnected is not None:
+            self._disconnected.set()
+
+    async def watch_disconnect(
+        self, awaitable: typing.Awaitable, cancel: bool = False
+    ) -> typing.Any:
+        """
+        awaits `awaitable` while watching for the client to go away,
+        with `cancel` the handler is cancelled on disconnect and
+        `ClientDisconnect` is raised.
+        """
+        task = asyncio.ensure_future(awaitable)
+        watcher = DisconnectWatcher(self, task if cancel else None)
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if task.cancelled() and self._is_disconnected:
+                raise ClientDisconnect()
+            raise
+        finally:
+            watcher.stop()
+
     async def stream(self):
         if hasattr(self, "_body"):
             yield self._body
             yield b""
             return
 
+        if hasattr(self, "_body_file"):
+            await run_in_threadpool(self._body_file.seek, 0)
+            while True:
+                chunk = await run_in_threadpool(
+                    self._body_file.read, self.spool_chunk_size
+                )
+                if not chunk:
+                    break
+                yield chunk
+            yield b""
+            return
+
         if self._stream_consumed:
             raise RuntimeError("Stream consumed")
 
         self._stream_consumed = True
+        max_body_size = self.max_body_size
+        if max_body_size is not None:
+            content_length = self.headers.get("content-length", "")
+            if content_length.isdigit() and int(content_length) > max_body_size:
+                raise HttpException(status_code=413)
+
+        received = 0
         while True:
             message = await self._receive()
             if message["type"] == "http.request":
                 body = message.get("body", b"")
                 if body:
+                    received += len(body)
+                    if max_body_size is not None and received > max_body_size:
+                        raise HttpException(status_code=413)
                     yield body
                 if not message.get("more_body", False):
                     break
             elif message["type"] == "http.disconnect":
-                self._is_disconnected = True
+                self._set_disconnected()
                 raise ClientDisconnect()
 
         yield b""
 
     async def body(self) -> bytes:
         if not hasattr(self, "_body"):
-            body = b""
-            async for chunk in self.stream():
-                body += chunk
-            self._body = body
+            if hasattr(self, "_body_file"):
+                await run_in_threadpool(self._body_file.seek, 0)
+                self._body = await run_in_threadpool(self._body_file.read)
+            else:
+                body = bytearray()
+                async for chunk in self.stream():
+                    body += chunk
+                self._body = bytes(body)
         return self._body
 
+    async def body_file(self) -> typing.IO:
+        """
+        the request body as a file, kept in memory up to `spool_max_size`
+        bytes and written to a temporary file above that.
+        """
+        if not hasattr(self, "_body_file"):
+            body_file = tempfile.SpooledTemporaryFile(max_size=self.spool_max_size)
+            if hasattr(self, "_body"):
+                await run_in_threadpool(body_file.write, self._body)
+            else:
+                pending = bytearray()
+                async for chunk in self.stream():
+                    pending += chunk
+                    if len(pending) >= self.spool_chunk_size:
+                        await run_in_threadpool(body_file.write, pending)
+                        del pending[:]
+                if pending:
+                    await run_in_threadpool(body_file.write, pending)
+            self._body_file = body_file
+
+        await run_in_threadpool(self._body_file.seek, 0)
+        return self._body_file
+
     async def json(self) -> typing.Any:
         if not hasattr(self, "_json"):
             body = await self.body()
-            self._json = json.loads(body)
+            self._json = get_json_codec().loads(body)
         return self._json
 
+    async def json_items(
+        self, prefix: str = "item"
+    ) -> typing.AsyncGenerator[typing.Any, None]:
+        parser = JSONItemsParser(self.stream, prefix=prefix)
+        async for item in parser.parse():
+            yield item
+
     async def form(self) -> FormData:
         if not hasattr(self, "_form"):
             assert (
@@ -218,9 +375,11 @@ class Request(HttpConnection):
     async def close(self):
         if hasattr(self, "_form"):
             await self._form.close()
+        if hasattr(self, "_body_file"):
+            await run_in_threadpool(self._body_file.close)
 
     async def is_disconnected(self) -> bool:
-        if not self._is_disconnected:
+        if not self._is_disconnected and self._watcher is None:
             try:
                 message = await asyncio.wait_for(self._receive(), timeout=0.00000001)
             except asyncio.TimeoutError:
@@ -228,6 +387,6 @@ class Request(HttpConnection):
 
             # todo: may raise KeyError
             if message.get("type") == "http.disconnect":
-                self._is_disconnected = True
+                self._set_disconnected()
 
         return self._is_disconnected
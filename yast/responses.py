@@ -1,16 +1,23 @@
+import asyncio
+import copy
+import csv
 import hashlib
-import http.cookies
-import json
+import io
+import mmap
 import os
 import stat
 import typing
-from email.utils import formatdate
+from email.utils import formatdate, parsedate
 from mimetypes import guess_type
-from urllib.parse import quote_plus
+from urllib.parse import quote, quote_plus
 
 from yast.background import BackgroundTask
-from yast.datastructures import URL, MutableHeaders
-from yast.types import Receive, Send
+from yast.concurrency import iterate_in_threadpool, run_in_threadpool
+from yast.config import get_json_codec
+from yast.datastructures import URL, MutableHeaders, dump_cookie
+from yast.datastructures.scope import scope_headers
+from yast.requests import DisconnectWatcher, Request
+from yast.types import Receive, Scope, Send
 
 try:
     import aiofiles
@@ -53,12 +60,13 @@ class Response(object):
             {
                 "type": "http.response.start",
                 "status": self.status_code,
-                "headers": [
-                    [key.encode(), self.headers[key].encode()] for key in self.headers
-                ],
+                "headers": list(self.raw_headers),
             }
         )
-        await send({"type": "http.response.body", "body": self.body})
+        if self.send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        else:
+            await send({"type": "http.response.body", "body": self.body})
         if self.background is not None:
             await self.background()
 
@@ -67,6 +75,29 @@ class Response(object):
             return content
         return content.encode(self.charset)
 
+    def copy(self) -> "Response":
+        """shallow copy with its own header list"""
+        response = copy.copy(self)
+        response.raw_headers = list(self.raw_headers)
+        response.__dict__.pop("_headers", None)
+        return response
+
+    def header_only(self) -> "Response":
+        if self.send_header_only:
+            return self
+        response = self.copy()
+        response.send_header_only = True
+        return response
+
+    def for_scope(self, scope: Scope) -> "Response":
+        """
+        adapts the response to the request it answers, a copy is returned
+        when anything changes, endpoints may return shared responses
+        """
+        if scope.get("method") == "HEAD":
+            return self.header_only()
+        return self
+
     def init_headers(self, headers: dict = None):
         if headers is None:
             raw_headers = []  # type: typing.List[typing.Tuple[bytes, bytes]]
@@ -82,7 +113,7 @@ class Response(object):
             missing_content_type = b"content-type" not in keys
 
         body = getattr(self, "body", b"")
-        if not self.send_header_only and body and missing_content_length:
+        if body and missing_content_length:
             raw_headers.append((b"content-length", str(len(body)).encode("latin-1")))
 
         content_type = self.media_type
@@ -104,21 +135,16 @@ class Response(object):
         secure: bool = False,
         httponly: bool = False,
     ) -> None:
-        cookie = http.cookies.SimpleCookie()
-        cookie[key] = value
-        if max_age is not None:
-            cookie[key]["max-age"] = max_age
-        if expires is not None:
-            cookie[key]["expires"] = expires
-        if path is not None:
-            cookie[key]["path"] = path
-        if domain is not None:
-            cookie[key]["domain"] = domain
-        if secure:
-            cookie[key]["secure"] = True
-        if httponly:
-            cookie[key]["httponly"] = True
-        cookie_val = cookie.output(header="").strip()
+        cookie_val = dump_cookie(
+            key,
+            value,
+            max_age=max_age,
+            expires=expires,
+            path=path,
+            domain=domain,
+            secure=secure,
+            httponly=httponly,
+        )
         self.raw_headers.append((b"set-cookie", cookie_val.encode("latin-1")))
 
     def del_cookie(self, key: str, path: str = "/", domain: str = None) -> None:
@@ -131,6 +157,48 @@ class Response(object):
         return self._headers
 
 
+class PreparedResponse(object):
+    """
+    constant response (404, health check, static json) rendered once and
+    sent as is on every call, messages are built per send because
+    middlewares may change them in place.
+    """
+
+    def __init__(self, response: Response, send_header_only: bool = False) -> None:
+        assert response.background is None, "PreparedResponse can not run background"
+        self.status_code = response.status_code
+        self.raw_headers = [tuple(header) for header in response.raw_headers]
+        self.body = response.body
+        self.background = None
+        self.send_header_only = send_header_only
+        self._header_only = None  # type: typing.Optional[PreparedResponse]
+
+    def header_only(self) -> "PreparedResponse":
+        if self.send_header_only:
+            return self
+        if self._header_only is None:
+            self._header_only = PreparedResponse(self, send_header_only=True)
+        return self._header_only
+
+    def for_scope(self, scope: Scope) -> "PreparedResponse":
+        if scope.get("method") == "HEAD":
+            return self.header_only()
+        return self
+
+    async def __call__(self, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": list(self.raw_headers),
+            }
+        )
+        if self.send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        else:
+            await send({"type": "http.response.body", "body": self.body})
+
+
 class HTMLResponse(Response):
     media_type = "text/html"
 
@@ -143,24 +211,29 @@ class JSONResponse(Response):
     media_type = "application/json"
 
     def render(self, content: typing.Any) -> bytes:
-        return json.dumps(
-            content,
-            ensure_ascii=False,
-            allow_nan=False,
-            indent=None,
-            separators=(",", ":"),
-        ).encode("utf-8")
+        return get_json_codec().dumps(content)
 
 
 class UJSONResponse(JSONResponse):
     def render(self, content: typing.Any) -> bytes:
-        return json.dumps(
-            content,
-            ensure_ascii=False,
-        ).encode("utf-8")
+        assert ujson is not None, "ujson must be installed to use UJSONResponse"
+        return ujson.dumps(content, ensure_ascii=False).encode("utf-8")
 
 
 class StreamingResponse(Response):
+    """
+    `content` is an async iterator, or a blocking iterator that is pulled in
+    the threadpool, one item per thread hop by default so slow iterators
+    stream as they produce, bulk exporters may raise `thread_batch_size`.
+    `coalesce_size` merges small chunks until that many bytes are buffered,
+    `coalesce_delay` (seconds) bounds how long buffered bytes may wait.
+    `chunks_produced` and `messages_sent` count body chunks and messages.
+    """
+
+    thread_batch_size = 1
+    # batches pulled ahead of `send`
+    thread_prefetch = 2
+
     def __init__(
         self,
         content: typing.Any,
@@ -169,7 +242,15 @@ class StreamingResponse(Response):
         media_type: str = None,
         background: BackgroundTask = None,
         method: str = None,
+        coalesce_size: int = 0,
+        coalesce_delay: float = None,
     ) -> None:
+        if not hasattr(content, "__aiter__"):
+            content = iterate_in_threadpool(
+                iter(content),
+                batch_size=self.thread_batch_size,
+                prefetch=self.thread_prefetch,
+            )
         self.body_iter = content
         self.status_code = status_code
         self.media_type = self.media_type if media_type is None else media_type
@@ -177,6 +258,10 @@ class StreamingResponse(Response):
         self.send_header_only = (
             method.upper() in ("HEAD") if method is not None else False
         )
+        self.coalesce_size = coalesce_size
+        self.coalesce_delay = coalesce_delay
+        self.chunks_produced = 0
+        self.messages_sent = 0
         self.init_headers(headers)
 
     async def __call__(self, receive: Receive, send: Send):
@@ -184,25 +269,436 @@ class StreamingResponse(Response):
             {
                 "type": "http.response.start",
                 "status": self.status_code,
-                "headers": [
-                    [key.encode(), self.headers[key].encode()] for key in self.headers
-                ],
+                "headers": list(self.raw_headers),
             }
         )
 
-        async for chunk in self.body_iter:
-            if not isinstance(chunk, bytes):
-                chunk = chunk.encode(self.charset)
-            await send({"type": "http.response.body", "body": chunk, "more_body": True})
-        await send({"type": "http.response.body", "body": b"", "more_body": False})
+        body = b""
+        if self.send_header_only:
+            pass
+        elif self.coalesce_size or self.coalesce_delay is not None:
+            body = await self.stream_coalesced(send)
+        else:
+            async for chunk in self.body_iter:
+                if not isinstance(chunk, bytes):
+                    chunk = chunk.encode(self.charset)
+                self.chunks_produced += 1
+                await self.send_body(send, chunk, more_body=True)
+        await self.send_body(send, body, more_body=False)
         if self.background is not None:
             await self.background()
 
+    async def send_body(self, send: Send, body: bytes, more_body: bool) -> None:
+        self.messages_sent += 1
+        await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+    async def stream_coalesced(self, send: Send) -> bytes:
+        """sends merged chunks, returns the bytes left for the last message"""
+        loop = asyncio.get_event_loop()
+        lock = asyncio.Lock()
+        buffer = bytearray()
+        timer = None  # type: typing.Optional[asyncio.TimerHandle]
+        # running timer-driven flushes, dropped once done
+        timed_flushes = set()  # type: typing.Set[asyncio.Future]
+
+        async def flush() -> None:
+            nonlocal buffer, timer
+            async with lock:
+                if timer is not None:
+                    timer.cancel()
+                    timer = None
+                if buffer:
+                    body, buffer = bytes(buffer), bytearray()
+                    await self.send_body(send, body, more_body=True)
+
+        def flush_later() -> None:
+            timed_flush = asyncio.ensure_future(flush())
+            timed_flushes.add(timed_flush)
+            timed_flush.add_done_callback(timed_flushes.discard)
+
+        try:
+            async for chunk in self.body_iter:
+                if not isinstance(chunk, bytes):
+                    chunk = chunk.encode(self.charset)
+                self.chunks_produced += 1
+                if not chunk:
+                    continue
+                if not buffer and self.coalesce_delay is not None:
+                    timer = loop.call_later(self.coalesce_delay, flush_later)
+                buffer += chunk
+                if self.coalesce_size and len(buffer) >= self.coalesce_size:
+                    await flush()
+
+            await asyncio.gather(*timed_flushes)
+            async with lock:
+                return bytes(buffer)
+        finally:
+            if timer is not None:
+                timer.cancel()
+            for timed_flush in list(timed_flushes):
+                timed_flush.cancel()
+
+
+class RowStreamingResponse(StreamingResponse):
+    """
+    streams `content` rows serialized to bytes by `serialize_row`, rows are
+    collected in a reused buffer sent every `chunk_size` bytes, blocking
+    iterables are serialized in the threadpool one chunk per thread hop.
+    """
+
+    chunk_size = 64 * 1024
+    thread_batch_size = 1
+    thread_prefetch = 1
+
+    def __init__(
+        self,
+        content: typing.Any,
+        serialize_row: typing.Callable[[typing.Any], bytes],
+        status_code: int = 200,
+        headers: dict = None,
+        media_type: str = None,
+        background: BackgroundTask = None,
+        method: str = None,
+    ) -> None:
+        self.serialize_row = serialize_row
+        self.buffer = bytearray()
+        if hasattr(content, "__aiter__"):
+            chunks = self.aiter_chunks(content)
+        else:
+            chunks = self.iter_chunks(content)
+        super().__init__(
+            chunks,
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type,
+            background=background,
+            method=method,
+        )
+
+    def write_row(self, row: typing.Any) -> int:
+        """buffers `row`, returns the buffered size in bytes"""
+        self.buffer += self.serialize_row(row)
+        return len(self.buffer)
+
+    def take(self) -> bytes:
+        """returns the buffered bytes and empties the buffer"""
+        chunk = bytes(self.buffer)
+        del self.buffer[:]
+        return chunk
+
+    def iter_chunks(self, rows: typing.Iterable) -> typing.Iterator[bytes]:
+        for row in rows:
+            if self.write_row(row) >= self.chunk_size:
+                yield self.take()
+        chunk = self.take()
+        if chunk:
+            yield chunk
+
+    async def aiter_chunks(
+        self, rows: typing.AsyncIterable
+    ) -> typing.AsyncIterator[bytes]:
+        async for row in rows:
+            if self.write_row(row) >= self.chunk_size:
+                yield self.take()
+        chunk = self.take()
+        if chunk:
+            yield chunk
+
+
+class NDJSONResponse(RowStreamingResponse):
+    """one json document per row and line, encoded by `get_json_codec()`"""
+
+    media_type = "application/x-ndjson"
+
+    def __init__(
+        self,
+        content: typing.Any,
+        status_code: int = 200,
+        headers: dict = None,
+        background: BackgroundTask = None,
+        method: str = None,
+    ) -> None:
+        super().__init__(
+            content,
+            self.dumps_row,
+            status_code=status_code,
+            headers=headers,
+            background=background,
+            method=method,
+        )
+
+    def dumps_row(self, row: typing.Any) -> bytes:
+        return get_json_codec().dumps(row) + b"\n"
+
+
+class CSVResponse(RowStreamingResponse):
+    """
+    rows are sequences written by `csv.writer`, or dicts written by
+    `csv.DictWriter` after a header row when `fieldnames` is given
+    """
+
+    media_type = "text/csv"
+
+    def __init__(
+        self,
+        content: typing.Any,
+        status_code: int = 200,
+        headers: dict = None,
+        background: BackgroundTask = None,
+        method: str = None,
+        fieldnames: typing.Sequence[str] = None,
+        filename: str = None,
+        dialect: str = "excel",
+    ) -> None:
+        self.text = io.StringIO()
+        if fieldnames is None:
+            self.writer = csv.writer(self.text, dialect=dialect)
+        else:
+            self.writer = csv.DictWriter(self.text, fieldnames, dialect=dialect)
+        super().__init__(
+            content,
+            self.dumps_row,
+            status_code=status_code,
+            headers=headers,
+            background=background,
+            method=method,
+        )
+        if fieldnames is not None:
+            self.writer.writeheader()
+            self.buffer += self.take_text()
+        if filename is not None:
+            self.headers.setdefault(
+                "content-disposition", content_disposition(filename)
+            )
+
+    def dumps_row(self, row: typing.Any) -> bytes:
+        self.writer.writerow(row)
+        return self.take_text()
+
+    def take_text(self) -> bytes:
+        text = self.text.getvalue()
+        self.text.seek(0)
+        self.text.truncate()
+        return text.encode(self.charset)
+
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    """
+    `filename` is quoted as is when it is plain ascii, otherwise sent
+    percent-encoded as `filename*` (RFC 6266), so quotes and newlines
+    never reach the header
+    """
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=UTF-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+
+def encode_event(
+    data: typing.Any = None,
+    event: str = None,
+    id: str = None,
+    retry: int = None,
+    comment: str = None,
+) -> bytes:
+    """
+    one server-sent event frame, multiline `data` is sent as several
+    `data:` lines, data that is not a string is json encoded
+    """
+    for field in (event, id):
+        if field is not None and ("\n" in field or "\r" in field):
+            raise ValueError(f"Event field can not contain a newline: {field!r}")
+
+    lines = []
+    if comment is not None:
+        lines.extend(": " + line for line in comment.splitlines() or [""])
+    if event is not None:
+        lines.append("event: " + event)
+    if id is not None:
+        lines.append("id: " + id)
+    if retry is not None:
+        lines.append("retry: %d" % retry)
+    if data is not None:
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        elif not isinstance(data, str):
+            data = get_json_codec().dumps(data).decode("utf-8")
+        lines.extend("data: " + line for line in data.splitlines() or [""])
+    lines.append("\n")
+    return "\n".join(lines).encode("utf-8")
+
+
+class EventSourceResponse(StreamingResponse):
+    """
+    Server-Sent Events, `content` yields events, `str` / `bytes` data or a
+    dict of `encode_event` arguments.
+    A `: ping` comment is sent after `ping_interval` seconds without events,
+    events produced within `flush_window` seconds are sent in one message.
+    Streaming stops, and `content` is closed, when the client disconnects,
+    disconnects are read by the `DisconnectWatcher` of `request`, the
+    running one is reused, so the endpoint may still read the body.
+    """
+
+    media_type = "text/event-stream"
+    ping_frame = b": ping\n\n"
+    thread_batch_size = 1
+    thread_prefetch = 1
+
+    def __init__(
+        self,
+        content: typing.Any,
+        status_code: int = 200,
+        headers: dict = None,
+        background: BackgroundTask = None,
+        method: str = None,
+        ping_interval: float = 15,
+        flush_window: float = None,
+        retry: int = None,
+        request: Request = None,
+    ) -> None:
+        super().__init__(
+            content,
+            status_code=status_code,
+            headers=headers,
+            background=background,
+            method=method,
+            coalesce_delay=flush_window,
+        )
+        self.events = self.body_iter
+        self.body_iter = self.encode_events()
+        self.ping_interval = ping_interval
+        self.retry = retry
+        self.request = request
+        self.completed = False
+        self.headers.setdefault("cache-control", "no-cache")
+        self.headers.setdefault("x-accel-buffering", "no")
+
+    async def __call__(self, receive: Receive, send: Send) -> None:
+        if self.send_header_only:
+            await super().__call__(receive, send)
+            return
+
+        request = self.request
+        if request is None:
+            request = Request({"type": "http"}, receive)
+        watcher = None if request.watching else DisconnectWatcher(request)
+
+        stream = asyncio.ensure_future(super().__call__(receive, send))
+        disconnected = asyncio.ensure_future(request.disconnected.wait())
+        try:
+            await asyncio.wait(
+                {stream, disconnected}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if stream.done() or self.completed:
+                # servers send `http.disconnect` once the response is done,
+                # the stream may still be running the background task
+                await stream
+                return
+
+            stream.cancel()
+            await asyncio.gather(stream, return_exceptions=True)
+            await self.close_events()
+            if self.background is not None:
+                await self.background()
+        finally:
+            disconnected.cancel()
+            if not stream.done():
+                stream.cancel()
+            if watcher is not None:
+                watcher.stop()
+
+    async def send_body(self, send: Send, body: bytes, more_body: bool) -> None:
+        await super().send_body(send, body, more_body)
+        if not more_body:
+            self.completed = True
+
+    async def close_events(self) -> None:
+        aclose = getattr(self.events, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    async def encode_events(self) -> typing.AsyncIterator[bytes]:
+        if self.retry is not None:
+            yield encode_event(retry=self.retry)
+
+        events = self.events.__aiter__()
+        next_event = None  # type: typing.Optional[asyncio.Future]
+        try:
+            while True:
+                if next_event is None:
+                    next_event = asyncio.ensure_future(events.__anext__())
+                done, _ = await asyncio.wait({next_event}, timeout=self.ping_interval)
+                if not done:
+                    yield self.ping_frame
+                    continue
+                event, next_event = next_event, None
+                try:
+                    event = event.result()
+                except StopAsyncIteration:
+                    return
+                if isinstance(event, dict):
+                    yield encode_event(**event)
+                else:
+                    yield encode_event(event)
+        finally:
+            if next_event is not None:
+                next_event.cancel()
+                await asyncio.gather(next_event, return_exceptions=True)
+
+
+def parse_range_header(
+    value: str, size: int, max_ranges: int = 16
+) -> typing.Optional[typing.List[typing.Tuple[int, int]]]:
+    """
+    `bytes=` ranges as sorted, merged `(start, end)` pairs, end included,
+    `None` when the header is invalid and must be ignored,
+    an empty list when no range can be satisfied.
+    """
+    unit, _, specs = value.partition("=")
+    if unit.strip().lower() != "bytes" or not specs.strip():
+        return None
+
+    ranges = []
+    for spec in specs.split(","):
+        start, sep, end = spec.strip().partition("-")
+        if not sep or not (start or end) or not (start + end).isdigit():
+            return None
+        if not start:
+            # suffix range, the last `end` bytes
+            if int(end) > 0 and size > 0:
+                ranges.append((max(size - int(end), 0), size - 1))
+            continue
+        first = int(start)
+        if end and int(end) < first:
+            return None
+        if first < size:
+            last = int(end) if end else size - 1
+            ranges.append((first, min(last, size - 1)))
+
+    if len(ranges) > max_ranges:
+        return None
+
+    merged = []  # type: typing.List[typing.Tuple[int, int]]
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(last, merged[-1][1]))
+        else:
+            merged.append((first, last))
+    return merged
 
-class FileResponse(Response):
-    """File Response"""
 
-    chunk_size = 4096
+class FileResponse(Response):
+    """
+    File Response, sent with `http.response.pathsend` or
+    `http.response.zerocopysend` when the server supports them, otherwise
+    read in chunks growing from `chunk_size` to `max_chunk_size`, or sent
+    from an mmap with `use_mmap`.
+    `Range` requests get 206 single or `multipart/byteranges` responses.
+    """
+
+    chunk_size = 64 * 1024
+    max_chunk_size = 1024 * 1024
+    use_mmap = False
 
     def __init__(
         self,
@@ -232,13 +728,19 @@ class FileResponse(Response):
         self.stat_result = stat_result
         if stat_result is not None:
             self.set_stat_headers(stat_result)
+        self.extensions = {}  # type: typing.Dict[str, typing.Any]
+        self.range = None  # type: typing.Optional[str]
+        self.if_range = None  # type: typing.Optional[str]
 
     def set_stat_headers(self, stat_result: os.stat_result):
-        stat_headers = self.get_stat_headers(stat_result)
-        for _name, _value in stat_headers.items():
-            if self.send_header_only and _name == "content-length":
-                continue
-            self.headers.setdefault(_name, _value)
+        headers = self.headers
+        if not all(
+            name in headers for name in ("content-length", "last-modified", "etag")
+        ):
+            stat_headers = self.get_stat_headers(stat_result)
+            for _name, _value in stat_headers.items():
+                headers.setdefault(_name, _value)
+        headers.setdefault("accept-ranges", "bytes")
 
     @classmethod
     def get_stat_headers(cls, stat_result: os.stat_result) -> typing.Dict[str, str]:
@@ -252,6 +754,31 @@ class FileResponse(Response):
             "etag": etag,
         }
 
+    def for_scope(self, scope: Scope) -> "Response":
+        response = self.copy()
+        response.extensions = scope.get("extensions") or {}
+        if scope.get("method") in ("GET", "HEAD"):
+            headers = scope_headers(scope)
+            response.range = headers.get("range")
+            response.if_range = headers.get("if-range")
+        if scope.get("method") == "HEAD":
+            response.send_header_only = True
+        return response
+
+    def get_ranges(self) -> typing.Optional[typing.List[typing.Tuple[int, int]]]:
+        if self.range is None or self.status_code != 200:
+            return None
+        if self.if_range is not None and not self.if_range_matches():
+            return None
+        return parse_range_header(self.range, self.stat_result.st_size)
+
+    def if_range_matches(self) -> bool:
+        if self.if_range == self.headers.get("etag"):
+            return True
+        if_range = parsedate(self.if_range)
+        last_modified = parsedate(self.headers.get("last-modified", ""))
+        return if_range is not None and if_range == last_modified
+
     async def __call__(self, receive: Receive, send: Send) -> None:
         if self.stat_result is None:
             try:
@@ -263,32 +790,186 @@ class FileResponse(Response):
                 mode = stat_result.st_mode
                 if not stat.S_ISREG(mode):
                     raise RuntimeError(f"File at path {self.path} is not a file.")
+                self.stat_result = stat_result
+
+        ranges = self.get_ranges()
+        # opened before `http.response.start`, a missing file is still an error
+        file = await self.open_file(ranges)
+        try:
+            if ranges is not None:
+                await self.send_ranges(send, ranges, file)
+            else:
+                await self.send_file(send, file)
+        finally:
+            if file is not None:
+                await run_in_threadpool(file.close)
 
+        if self.background is not None:
+            await self.background()
+
+    async def open_file(
+        self, ranges: typing.Optional[typing.List[typing.Tuple[int, int]]]
+    ) -> typing.Optional[typing.BinaryIO]:
+        if self.send_header_only or ranges == []:
+            return None
+        if ranges is None and "http.response.pathsend" in self.extensions:
+            await aio_stat(self.path)  # the server opens it
+            return None
+        return await run_in_threadpool(open, self.path, "rb")
+
+    async def send_file(self, send: Send, file: typing.Optional[typing.BinaryIO]):
         await send(
             {
                 "type": "http.response.start",
                 "status": self.status_code,
-                "headers": self.raw_headers,
+                "headers": list(self.raw_headers),
             }
         )
-        if self.send_header_only:
-            await send({"type": "http.response.body"})
+        if file is not None:
+            await self.send_range(send, file, 0, self.stat_result.st_size)
+        elif self.send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
         else:
-            async with aiofiles.open(self.path, mode="rb") as file:
-                more_body = True
-                while more_body:
-                    chunk = await file.read(self.chunk_size)
-                    more_body = len(chunk) == self.chunk_size
-                    await send(
-                        {
-                            "type": "http.response.body",
-                            "body": chunk,
-                            "more_body": more_body,
-                        }
-                    )
+            await send(
+                {"type": "http.response.pathsend", "path": os.path.abspath(self.path)}
+            )
 
-        if self.background is not None:
-            await self.background()
+    async def send_ranges(
+        self,
+        send: Send,
+        ranges: typing.List[typing.Tuple[int, int]],
+        file: typing.Optional[typing.BinaryIO],
+    ) -> None:
+        size = self.stat_result.st_size
+        if not ranges:
+            self.status_code = 416
+            self.headers["content-range"] = f"bytes */{size}"
+            self.headers["content-length"] = "0"
+            ranges = []
+        else:
+            self.status_code = 206
+
+        parts = []  # type: typing.List[typing.Tuple[bytes, int, int]]
+        if len(ranges) == 1:
+            first, last = ranges[0]
+            self.headers["content-range"] = f"bytes {first}-{last}/{size}"
+            self.headers["content-length"] = str(last - first + 1)
+            parts.append((b"", first, last - first + 1))
+            closing = b""
+        elif ranges:
+            boundary = hashlib.md5(os.urandom(16)).hexdigest()
+            content_type = self.headers.get("content-type", "application/octet-stream")
+            content_length = 0
+            for first, last in ranges:
+                part_header = (
+                    f"--{boundary}\r\nContent-Type: {content_type}\r\n"
+                    f"Content-Range: bytes {first}-{last}/{size}\r\n\r\n"
+                ).encode("latin-1")
+                if parts:
+                    part_header = b"\r\n" + part_header
+                parts.append((part_header, first, last - first + 1))
+                content_length += len(part_header) + last - first + 1
+            closing = f"\r\n--{boundary}--\r\n".encode("latin-1")
+            self.headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+            self.headers["content-length"] = str(content_length + len(closing))
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": list(self.raw_headers),
+            }
+        )
+        if file is None or not parts:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        for part_header, offset, count in parts:
+            if part_header:
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": part_header,
+                        "more_body": True,
+                    }
+                )
+            await self.send_range(send, file, offset, count, more_body=True)
+        await send({"type": "http.response.body", "body": closing, "more_body": False})
+
+    async def send_range(
+        self,
+        send: Send,
+        file: typing.BinaryIO,
+        offset: int,
+        count: int,
+        more_body: bool = False,
+    ) -> None:
+        if "http.response.zerocopysend" in self.extensions:
+            await send(
+                {
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": offset,
+                    "count": count,
+                    "more_body": more_body,
+                }
+            )
+        elif self.use_mmap and count > 0:
+            await self.send_mmap(send, file, offset, count, more_body)
+        else:
+            await self.send_chunks(send, file, offset, count, more_body)
+
+    async def send_mmap(
+        self,
+        send: Send,
+        file: typing.BinaryIO,
+        offset: int,
+        count: int,
+        more_body: bool,
+    ) -> None:
+        mapped = await run_in_threadpool(
+            mmap.mmap, file.fileno(), 0, access=mmap.ACCESS_READ
+        )
+        try:
+            end = offset + count
+            while offset < end:
+                size = min(self.max_chunk_size, end - offset)
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": mapped[offset : offset + size],
+                        "more_body": more_body or offset + size < end,
+                    }
+                )
+                offset += size
+        finally:
+            mapped.close()
+
+    async def send_chunks(
+        self,
+        send: Send,
+        file: typing.BinaryIO,
+        offset: int,
+        count: int,
+        more_body: bool,
+    ) -> None:
+        if offset:
+            await run_in_threadpool(file.seek, offset)
+        chunk_size = self.chunk_size
+        while True:
+            chunk = await run_in_threadpool(file.read, min(chunk_size, count))
+            count -= len(chunk)
+            last = count <= 0 or not chunk
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": more_body or not last,
+                }
+            )
+            if last:
+                break
+            chunk_size = min(chunk_size * 2, self.max_chunk_size)
 
 
 class RedirectResponse(Response):
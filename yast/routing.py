@@ -3,16 +3,26 @@ import inspect
 import re
 import typing
 from asyncio import iscoroutinefunction
+from collections import OrderedDict
 
 from yast.concurrency import run_in_threadpool
 from yast.convertors import CONVERTOR_TYPES, Convertor
-from yast.datastructures import URL, Headers, URLPath
+from yast.datastructures import URL, URLPath
+from yast.datastructures.scope import scope_host
 from yast.exceptions import HttpException
-from yast.requests import Request
-from yast.responses import PlainTextResponse, RedirectResponse
+from yast.requests import ClientDisconnect, Request
+from yast.responses import (
+    PlainTextResponse,
+    PreparedResponse,
+    RedirectResponse,
+    Response,
+)
 from yast.types import ASGIApp, ASGIInstance, Receive, Scope, Send
 from yast.websockets import WebSocket, WebSocketClose
 
+NOT_FOUND = PreparedResponse(PlainTextResponse("Not Found", 404))
+METHOD_NOT_ALLOWED = PreparedResponse(PlainTextResponse("Method Not Allowed", 405))
+
 
 class NoMatchFound(Exception):
     pass
@@ -61,6 +71,31 @@ def compile_path(
     return re.compile(path_regex), path_format, param_converts
 
 
+def compile_format(path_format: str) -> typing.List[typing.Tuple[str, str]]:
+    parts = []
+    idx = 0
+    for match in PARAM_REGEX.finditer(path_format):
+        parts.append((path_format[idx : match.start()], match.group(1)))
+        idx = match.end()
+    parts.append((path_format[idx:], None))
+    return parts
+
+
+def render_format(
+    parts: typing.List[typing.Tuple[str, str]],
+    param_converts: typing.Dict[str, Convertor],
+    path_params: typing.Mapping[str, typing.Any],
+) -> str:
+    return "".join(
+        (
+            static
+            if param_name is None
+            else static + param_converts[param_name].to_string(path_params[param_name])
+        )
+        for static, param_name in parts
+    )
+
+
 class BaseRoute(object):
     def matches(self, scope: Scope) -> typing.Tuple[Match, Scope]:
         raise NotImplementedError()  # pragma: nocover
@@ -68,6 +103,14 @@ class BaseRoute(object):
     def url_path_for(self, name: str, **path_params: str) -> URLPath:
         raise NotImplementedError()  # pragma: nocover
 
+    def url_path_lookup(
+        self, name: str, path_params: typing.Dict[str, typing.Any]
+    ) -> typing.Optional[URLPath]:
+        try:
+            return self.url_path_for(name, **path_params)
+        except NoMatchFound:
+            return None
+
     def __call__(self, scope: Scope) -> ASGIInstance:
         raise NotImplementedError()  # pragma: nocover
 
@@ -88,6 +131,8 @@ class Route(BaseRoute):
         methods: typing.Sequence[str] = None,
         name: str = None,
         include_in_schema: bool = True,
+        watch_disconnect: bool = False,
+        cancel_on_disconnect: bool = False,
     ) -> None:
         assert path.startswith("/"), 'Routed paths must always start "/"'
         self.path = path
@@ -95,7 +140,11 @@ class Route(BaseRoute):
         self.name = get_name(endpoint) if name is None else name
         self.include_in_schema = include_in_schema
         if inspect.isfunction(endpoint) or inspect.ismethod(endpoint):
-            self.app = req_res(endpoint)
+            self.app = req_res(
+                endpoint,
+                watch_disconnect=watch_disconnect,
+                cancel_on_disconnect=cancel_on_disconnect,
+            )
             if methods is None:
                 methods = ["GET"]
         else:
@@ -109,6 +158,8 @@ class Route(BaseRoute):
                 self.methods |= set(["HEAD"])
 
         (self.path_regex, self.path_format, self.param_convertors) = compile_path(path)
+        self.path_parts = compile_format(self.path_format)
+        self.param_names = frozenset(self.param_convertors)
 
     def matches(self, scope: Scope) -> typing.Tuple[Match, Scope]:
         if scope["type"] == "http":
@@ -127,20 +178,24 @@ class Route(BaseRoute):
         return Match.NONE, {}
 
     def url_path_for(self, name: str, **path_params: str) -> URLPath:
-        seen_params = set(path_params.keys())
-        excepted_params = set(self.param_convertors.keys())
-        if name != self.name or seen_params != excepted_params:
+        url = self.url_path_lookup(name, path_params)
+        if url is None:
             raise NoMatchFound()
-        path, remaining_params = replace_params(
-            self.path_format, self.param_convertors, path_params
-        )
+        return url
+
+    def url_path_lookup(
+        self, name: str, path_params: typing.Dict[str, typing.Any]
+    ) -> typing.Optional[URLPath]:
+        if name != self.name or path_params.keys() != self.param_names:
+            return None
+        path = render_format(self.path_parts, self.param_convertors, path_params)
         return URLPath(protocol="http", path=path)
 
     def __call__(self, scope: Scope) -> ASGIInstance:
         if self.methods and scope["method"] not in self.methods:
             if "app" in scope:
                 raise HttpException(status_code=405)
-            return PlainTextResponse("Method Not Allowed", 405)
+            return METHOD_NOT_ALLOWED
 
         return self.app(scope)
 
@@ -171,6 +226,8 @@ class WebSocketRoute(BaseRoute):
         regex = re.sub("{([a-zA-Z_][a-zA-Z0-9_]*)}", r"(?P<\1>[^/]+)", regex)
 
         (self.path_regex, self.path_format, self.param_convertors) = compile_path(path)
+        self.path_parts = compile_format(self.path_format)
+        self.param_names = frozenset(self.param_convertors)
 
     def matches(self, scope: Scope) -> typing.Tuple[Match, Scope]:
         if scope["type"] == "websocket":
@@ -186,14 +243,17 @@ class WebSocketRoute(BaseRoute):
         return Match.NONE, {}
 
     def url_path_for(self, name: str, **path_params: str) -> URLPath:
-        seen_params = set(path_params.keys())
-        expected_params = set(self.param_convertors.keys())
-        if name != self.name or seen_params != expected_params:
+        url = self.url_path_lookup(name, path_params)
+        if url is None:
             raise NoMatchFound()
-        path, remaining_params = replace_params(
-            self.path_format, self.param_convertors, path_params
-        )
-        assert not remaining_params
+        return url
+
+    def url_path_lookup(
+        self, name: str, path_params: typing.Dict[str, typing.Any]
+    ) -> typing.Optional[URLPath]:
+        if name != self.name or path_params.keys() != self.param_names:
+            return None
+        path = render_format(self.path_parts, self.param_convertors, path_params)
         return URLPath(protocol="websocket", path=path)
 
     def __call__(self, scope: Scope) -> ASGIInstance:
@@ -224,11 +284,15 @@ class Mount(BaseRoute):
             self.app = app
         else:
             self.app = Router(routes=routes)
+        self.flatten = routes is not None
 
         self.name = name
         (self.path_regex, self.path_format, self.param_convertors) = compile_path(
             self.path + "/{path:path}"
         )
+        self.path_parts = compile_format(self.path_format)
+        self.param_names = frozenset(self.param_convertors)
+        self.prefix_names = self.param_names - {"path"}
 
     @property
     def routes(self):
@@ -256,13 +320,25 @@ class Mount(BaseRoute):
         return Match.NONE, {}
 
     def url_path_for(self, name: str, **path_params: str) -> URLPath:
+        url = self.url_path_lookup(name, path_params)
+        if url is None:
+            raise NoMatchFound()
+        return url
+
+    def url_path_lookup(
+        self, name: str, path_params: typing.Dict[str, typing.Any]
+    ) -> typing.Optional[URLPath]:
         if self.name is not None and name == self.name and "path" in path_params:
-            path_params["path"] = path_params["path"].lstrip("/")
-            path, remaining_params = replace_params(
-                self.path_format, self.param_convertors, path_params
+            if path_params.keys() != self.param_names:
+                return None
+            path = path_params["path"].lstrip("/")
+            static_url = getattr(self.app, "static_url", None)
+            if static_url is not None:
+                path = static_url(path)
+            path_params = dict(path_params, path=path)
+            return URLPath(
+                render_format(self.path_parts, self.param_convertors, path_params)
             )
-            if not remaining_params:
-                return URLPath(path)
 
         elif self.name is None or name.startswith(self.name + ":"):
             if self.name is None:
@@ -270,21 +346,19 @@ class Mount(BaseRoute):
             else:
                 remaining_name = name[len(self.name) + 1 :]
 
-            path_params["path"] = ""
+            if not self.prefix_names <= path_params.keys():
+                return None
+            remaining_params = {
+                _k: _v for _k, _v in path_params.items() if _k not in self.prefix_names
+            }
+            url = app_url_path_lookup(self.app, remaining_name, remaining_params)
+            if url is not None:
+                path = render_format(
+                    self.path_parts, self.param_convertors, dict(path_params, path="")
+                )
+                return URLPath(protocol=url.protocol, path=path.rstrip("/") + str(url))
 
-            path, remaining_params = replace_params(
-                self.path_format, self.param_convertors, path_params
-            )
-            for route in self.routes or []:
-                try:
-                    url = route.url_path_for(remaining_name, **remaining_params)
-                    return URLPath(
-                        protocol=url.protocol, path=path.rstrip("/") + str(url)
-                    )
-                except NoMatchFound:
-                    pass
-
-        raise NoMatchFound()
+        return None
 
     def __call__(self, scope: Scope) -> ASGIInstance:
         return self.app(scope)
@@ -303,6 +377,8 @@ class Host(BaseRoute):
         self.app = app
         self.name = name
         (self.host_regex, self.host_format, self.param_convertors) = compile_path(host)
+        self.host_parts = compile_format(self.host_format)
+        self.param_names = frozenset(self.param_convertors)
 
     @property
     def routes(self) -> typing.List[BaseRoute]:
@@ -310,8 +386,7 @@ class Host(BaseRoute):
 
     def matches(self, scope: Scope) -> typing.Tuple[Match, Scope]:
         if scope["type"] in ("http", "websocket"):
-            headers = Headers(scope=scope)
-            host = headers.get("host", "").split(":")[0]
+            host = get_host(scope)
             matched = self.host_regex.match(host)
             if matched:
                 matched_params = matched.groupdict()
@@ -326,31 +401,40 @@ class Host(BaseRoute):
         return Match.NONE, {}
 
     def url_path_for(self, name: str, **path_params: str) -> URLPath:
+        url = self.url_path_lookup(name, path_params)
+        if url is None:
+            raise NoMatchFound()
+        return url
+
+    def url_path_lookup(
+        self, name: str, path_params: typing.Dict[str, typing.Any]
+    ) -> typing.Optional[URLPath]:
         if self.name is not None and name == self.name and "path" in path_params:
+            path_params = dict(path_params)
             path = path_params.pop("path")
-            host, remaining_params = replace_params(
-                self.host_format, self.param_convertors, path_params
-            )
-            if not remaining_params:
-                return URLPath(path=path, host=host)
+            if path_params.keys() != self.param_names:
+                return None
+            host = render_format(self.host_parts, self.param_convertors, path_params)
+            return URLPath(path=path, host=host)
         elif self.name is None or name.startswith(self.name + ":"):
             if self.name is None:
                 remaining_name = name
             else:
                 remaining_name = name[len(self.name) + 1 :]
 
-            host, remaining_params = replace_params(
-                self.host_format, self.param_convertors, path_params
-            )
-
-            for route in self.routes or []:
-                try:
-                    url = route.url_path_for(remaining_name, **remaining_params)
-                    return URLPath(path=str(url), protocol=url.protocol, host=host)
-                except NoMatchFound:
-                    pass
+            if not self.param_names <= path_params.keys():
+                return None
+            remaining_params = {
+                _k: _v for _k, _v in path_params.items() if _k not in self.param_names
+            }
+            url = app_url_path_lookup(self.app, remaining_name, remaining_params)
+            if url is not None:
+                host = render_format(
+                    self.host_parts, self.param_convertors, path_params
+                )
+                return URLPath(path=str(url), protocol=url.protocol, host=host)
         # endelse
-        raise NoMatchFound()
+        return None
 
     def __call__(self, scope: Scope) -> ASGIInstance:
         return self.app(scope)
@@ -363,25 +447,333 @@ class Host(BaseRoute):
         )
 
 
+class MountedRoute(BaseRoute):
+    """
+    a route of a frozen router mounted under the static `prefix`, flattened
+    into the parent `RouteTree` by `Router.freeze`
+    """
+
+    def __init__(self, prefix: str, route: BaseRoute) -> None:
+        self.prefix = prefix
+        self.route = route
+        if isinstance(route, Mount):
+            self.path = prefix + route.path + "/{path:path}"
+        else:
+            self.path = prefix + route.path
+
+    def matches(self, scope: Scope) -> typing.Tuple[Match, Scope]:
+        path = scope["path"]
+        if not path.startswith(self.prefix + "/"):
+            return Match.NONE, {}
+
+        mounted_scope = dict(scope)
+        mounted_scope["root_path"] = scope.get("root_path", "") + self.prefix
+        mounted_scope["path"] = path[len(self.prefix) :]
+        match, child_scope = self.route.matches(mounted_scope)
+        if match != Match.FULL:
+            # left to the mounted router, e.g. for its 405 response
+            return Match.NONE, {}
+        child_scope.setdefault("root_path", mounted_scope["root_path"])
+        child_scope.setdefault("path", mounted_scope["path"])
+        return Match.FULL, child_scope
+
+    def __call__(self, scope: Scope) -> ASGIInstance:
+        return self.route(scope)
+
+
+class RouteTreeNode(object):
+    __slots__ = ("statics", "params", "leaves", "tails")
+
+    def __init__(self) -> None:
+        self.statics = {}  # type: typing.Dict[str, RouteTreeNode]
+        self.params = (
+            {}
+        )  # type: typing.Dict[str, typing.Tuple[typing.Pattern, RouteTreeNode]]
+        self.leaves = []  # type: typing.List[int]
+        self.tails = []  # type: typing.List[int]
+
+
+class RouteTree(object):
+    """
+    prefix tree built from the path templates of `Route`, `WebSocketRoute`
+    and `Mount`, one level per path segment.
+
+    `lookup` only narrows the routes down to the candidates, in their
+    declared order, the caller still runs `matches` on each of them, so the
+    FULL/PARTIAL semantics stay the same as the linear scan.
+    templates that cannot be split per segment (e.g. `/file-{id}.txt`,
+    `{param:float}`) and other routes are always candidates, `Host` routes
+    are left to `HostTable`.
+    """
+
+    SEGMENT_CONVERTORS = ("str", "int")
+
+    def __init__(self, routes: typing.List[BaseRoute]) -> None:
+        self.routes = list(routes)
+        self.root = RouteTreeNode()
+        self.fallbacks = []  # type: typing.List[int]
+
+        for index, route in enumerate(self.routes):
+            if isinstance(route, Mount):
+                template = route.path + "/{path:path}"
+            elif isinstance(route, (Route, WebSocketRoute, MountedRoute)):
+                template = route.path
+            elif isinstance(route, Host):
+                continue
+            else:
+                self.fallbacks.append(index)
+                continue
+
+            if not self.insert(template, index):
+                self.fallbacks.append(index)
+
+    def __len__(self) -> int:
+        return len(self.routes)
+
+    def insert(self, template: str, index: int) -> bool:
+        segments = template[1:].split("/")
+        node = self.root
+        for pos, segment in enumerate(segments):
+            matched = PARAM_REGEX.fullmatch(segment)
+            if matched is None:
+                if "{" in segment:
+                    return False
+                node = node.statics.setdefault(segment, RouteTreeNode())
+                continue
+
+            convert_type = (matched.group(2) or ":str").lstrip(":")
+            if convert_type == "path" and pos == len(segments) - 1:
+                node.tails.append(index)
+                return True
+
+            if convert_type not in self.SEGMENT_CONVERTORS:
+                return False
+
+            regex = CONVERTOR_TYPES[convert_type].regex
+            if regex not in node.params:
+                node.params[regex] = (re.compile(regex), RouteTreeNode())
+            node = node.params[regex][1]
+        # endfor
+        node.leaves.append(index)
+        return True
+
+    def lookup(self, path: str) -> typing.List[int]:
+        found = list(self.fallbacks)
+        self._walk(self.root, path[1:].split("/"), 0, found)
+        return found
+
+    def _walk(
+        self,
+        node: RouteTreeNode,
+        segments: typing.List[str],
+        pos: int,
+        found: typing.List[int],
+    ) -> None:
+        if pos == len(segments):
+            found.extend(node.leaves)
+            return
+
+        found.extend(node.tails)
+        segment = segments[pos]
+        child = node.statics.get(segment)
+        if child is not None:
+            self._walk(child, segments, pos + 1, found)
+        for regex, child in node.params.values():
+            if regex.fullmatch(segment):
+                self._walk(child, segments, pos + 1, found)
+
+
+class HostTable(object):
+    """
+    `Host` routes indexed by host name: hosts without params are kept in
+    a dict, parametric ones by the domain after their last param
+    (e.g. `example.org` for `{subdomain}.example.org`), so the lookup cost
+    depends on the number of labels in the host, not on the number of hosts.
+    """
+
+    def __init__(self, routes: typing.List[BaseRoute]) -> None:
+        self.routes = list(routes)
+        self.exact = {}  # type: typing.Dict[str, typing.List[int]]
+        self.suffixes = {}  # type: typing.Dict[str, typing.List[int]]
+        self.parametric = []  # type: typing.List[int]
+        self.others = []  # type: typing.List[int]
+
+        for index, route in enumerate(self.routes):
+            if not isinstance(route, Host):
+                self.others.append(index)
+            elif not route.param_convertors:
+                self.exact.setdefault(route.host, []).append(index)
+            else:
+                suffix = route.host_format[route.host_format.rindex("}") + 1 :]
+                if "." in suffix:
+                    domain = suffix.split(".", 1)[1]
+                    self.suffixes.setdefault(domain, []).append(index)
+                else:
+                    self.parametric.append(index)
+        self.other_routes = [self.routes[index] for index in self.others]
+        self.has_hosts = len(self.others) != len(self.routes)
+
+    def __len__(self) -> int:
+        return len(self.routes)
+
+    def lookup(self, host: str) -> typing.List[int]:
+        found = self.exact.get(host, []) + self.parametric
+        pos = host.find(".")
+        while pos != -1:
+            found += self.suffixes.get(host[pos + 1 :], [])
+            pos = host.find(".", pos + 1)
+        return found
+
+
+class RouteNameIndex(object):
+    """
+    name -> routes index used by `Router.url_path_lookup`, it keeps the
+    declared order of the routes, unnamed `Mount`, `Host` and other routes
+    are tried for every name.
+    """
+
+    def __init__(self, routes: typing.List[BaseRoute]) -> None:
+        self.routes = list(routes)
+        self.names = {}  # type: typing.Dict[str, typing.List[int]]
+        self.prefixes = {}  # type: typing.Dict[str, typing.List[int]]
+        self.anonymous = []  # type: typing.List[int]
+
+        for index, route in enumerate(self.routes):
+            name = getattr(route, "name", None)
+            if isinstance(route, (Route, WebSocketRoute)):
+                self.names.setdefault(name, []).append(index)
+            elif isinstance(route, (Mount, Host)) and name is not None:
+                self.names.setdefault(name, []).append(index)
+                self.prefixes.setdefault(name, []).append(index)
+            else:
+                self.anonymous.append(index)
+
+    def __len__(self) -> int:
+        return len(self.routes)
+
+    def lookup(
+        self, name: str, path_params: typing.Dict[str, typing.Any]
+    ) -> typing.Optional[URLPath]:
+        indexes = self.names.get(name, []) + self.anonymous
+        pos = name.find(":")
+        while pos != -1:
+            indexes += self.prefixes.get(name[:pos], [])
+            pos = name.find(":", pos + 1)
+
+        for index in sorted(set(indexes)):
+            url = self.routes[index].url_path_lookup(name, path_params)
+            if url is not None:
+                return url
+        return None
+
+
+class SlashRedirectTable(object):
+    """
+    paths ending with "/" that a static `Route` or `Mount` serves, used to
+    decide `redirect_slashes` without matching every route a second time,
+    only the parametric routes still need to be matched.
+    """
+
+    REGEX_CHARS = frozenset(".^$*+?()[]{}\\|")
+
+    def __init__(self, routes: typing.List[BaseRoute]) -> None:
+        self.routes = list(routes)
+        self.statics = set()  # type: typing.Set[str]
+        self.parametric = []  # type: typing.List[BaseRoute]
+
+        for route in self.routes:
+            if isinstance(route, (WebSocketRoute, Host)):
+                # never matches the http scope by path only
+                continue
+
+            path = getattr(route, "path", None)
+            if path is None or self.REGEX_CHARS.intersection(path):
+                self.parametric.append(route)
+            elif isinstance(route, Mount):
+                self.statics.add(path + "/")
+            elif isinstance(route, Route):
+                if path.endswith("/"):
+                    self.statics.add(path)
+            else:
+                self.parametric.append(route)
+
+    def __len__(self) -> int:
+        return len(self.routes)
+
+
+class RouteMatchCache(object):
+    """
+    LRU of `(scope type, method, path[, host]) -> (route, path params)`,
+    only matches resolved to a `Route` or `WebSocketRoute` are stored, so
+    unmatched paths never take up room.
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()  # type: OrderedDict
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: typing.Hashable) -> typing.Optional[typing.Tuple]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def set(self, key: typing.Hashable, entry: typing.Tuple) -> None:
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+
 class Router(object):
     def __init__(
         self,
         routes: typing.List[BaseRoute] = None,
         redirect_slashes: bool = True,
         default: ASGIApp = None,
+        route_tree: bool = False,
+        match_cache_size: int = 0,
     ) -> None:
         self.routes = [] if routes is None else list(routes)
         self.redirect_slashes = redirect_slashes
         self.default = self.not_found if default is None else default
+        self.route_tree = route_tree
+        self._tree = None
+        self._host_table = None
+        self._name_index = None
+        self._slash_table = None
+        self.redirect_fallbacks = 0
+        self.frozen = False
+        self._mount_prefixes = {}  # type: typing.Dict[int, str]
+        self._flat_routes = None  # type: typing.Optional[typing.List[BaseRoute]]
+        self.match_cache = None
+        if match_cache_size > 0:
+            self.match_cache = RouteMatchCache(maxsize=match_cache_size)
+        self._match_cache_state = None
         self._lifespan = None
 
     def mount(self, path: str, app: ASGIApp, name: str = None) -> None:
+        self.check_frozen()
         prefix = Mount(path, app=app, name=name)
         self.routes.append(prefix)
+        self.routes_changed()
 
     def host(self, host: str, app: ASGIApp, name: str = None) -> None:
+        self.check_frozen()
         route = Host(host, app=app, name=name)
         self.routes.append(route)
+        self.routes_changed()
 
     def route(
         self,
@@ -389,6 +781,8 @@ class Router(object):
         methods: typing.Sequence[str] = None,
         name: str = None,
         include_in_schema: bool = True,
+        watch_disconnect: bool = False,
+        cancel_on_disconnect: bool = False,
     ) -> typing.Callable:
         def decorator(func: typing.Callable) -> typing.Callable:
             self.add_route(
@@ -397,6 +791,8 @@ class Router(object):
                 methods=methods,
                 name=name,
                 include_in_schema=include_in_schema,
+                watch_disconnect=watch_disconnect,
+                cancel_on_disconnect=cancel_on_disconnect,
             )
             return func
 
@@ -416,19 +812,91 @@ class Router(object):
         methods: typing.Sequence[str] = None,
         name: str = None,
         include_in_schema: bool = True,
+        watch_disconnect: bool = False,
+        cancel_on_disconnect: bool = False,
     ) -> None:
+        self.check_frozen()
         instance = Route(
             path,
             endpoint=endpoint,
             methods=methods,
             name=name,
             include_in_schema=include_in_schema,
+            watch_disconnect=watch_disconnect,
+            cancel_on_disconnect=cancel_on_disconnect,
         )
         self.routes.append(instance)
+        self.routes_changed()
 
     def add_route_ws(self, path: str, route: typing.Callable, name: str = None) -> None:
+        self.check_frozen()
         instance = WebSocketRoute(path, name=name, endpoint=route)
         self.routes.append(instance)
+        self.routes_changed()
+
+    def routes_changed(self) -> None:
+        self._tree = None
+        self._flat_routes = None
+        self._host_table = None
+        self._name_index = None
+        self._slash_table = None
+        self._match_cache_state = None
+        if self.match_cache is not None:
+            self.match_cache.clear()
+
+    def check_frozen(self) -> None:
+        if self.frozen:
+            raise RuntimeError("Router has been frozen, routes cannot be added")
+
+    def freeze(self) -> None:
+        """
+        compile the routes once, e.g. on startup: sub routers created by
+        `Mount(routes=...)` are frozen too, and their static prefix is
+        matched with `str.startswith` instead of the `{path:path}` regex.
+        with `route_tree`, the routes of those sub routers are also added to
+        this router's tree under their prefix, so a nested route is found by
+        a single lookup, paths they miss still go through the mount.
+        `Mount(app=...)` sub apps are left as they are.
+        """
+        if self.frozen:
+            return
+
+        mount_prefixes = {}
+        flat_routes = []
+        for route in self.routes:
+            if isinstance(route, Mount) and route.flatten:
+                route.app.freeze()
+                if not SlashRedirectTable.REGEX_CHARS.intersection(route.path):
+                    mount_prefixes[id(route)] = route.path
+                    if self.route_tree:
+                        mounted = route.app.mounted_routes(route.path)
+                        flat_routes.extend(mounted or [])
+            flat_routes.append(route)
+
+        self._mount_prefixes = mount_prefixes
+        if len(flat_routes) != len(self.routes):
+            self._flat_routes = flat_routes
+        self._host_table = HostTable(flat_routes)
+        self._name_index = RouteNameIndex(self.routes)
+        self._slash_table = SlashRedirectTable(self.routes)
+        if self.route_tree:
+            self._tree = RouteTree(flat_routes)
+        self.frozen = True
+
+    def mounted_routes(self, prefix: str) -> typing.Optional[typing.List[BaseRoute]]:
+        """
+        the routes of this frozen router as `MountedRoute`, in the order they
+        are matched, None when some route can not be matched that way
+        """
+        mounted = []  # type: typing.List[BaseRoute]
+        for route in self.routes:
+            if not isinstance(route, (Route, WebSocketRoute, Mount)):
+                return None
+            if id(route) in self._mount_prefixes:
+                nested = route.app.mounted_routes(prefix + route.path)
+                mounted.extend(nested or [])
+            mounted.append(MountedRoute(prefix, route))
+        return mounted
 
     def not_found(self, scope: Scope) -> ASGIInstance:
         if scope["type"] == "websocket":
@@ -436,16 +904,104 @@ class Router(object):
 
         if "app" in scope:
             raise HttpException(status_code=404)
-        return PlainTextResponse("Not Found", 404)
+        return NOT_FOUND
+
+    def host_table(self) -> HostTable:
+        routes = self.routes if self._flat_routes is None else self._flat_routes
+        if self._host_table is None or len(self._host_table) != len(routes):
+            self._host_table = HostTable(routes)
+        return self._host_table
+
+    def candidates(self, scope: Scope, host: str = None) -> typing.List[BaseRoute]:
+        if scope["type"] not in ("http", "websocket"):
+            return self.routes
+
+        host_table = self.host_table()
+        routes = host_table.routes
+        if host is None and host_table.has_hosts:
+            host = get_host(scope)
+
+        if self.route_tree:
+            if self._tree is None or len(self._tree) != len(routes):
+                self._tree = RouteTree(routes)
+            found = self._tree.lookup(scope["path"])
+            if host_table.has_hosts:
+                found += host_table.lookup(host)
+            return [routes[index] for index in sorted(set(found))]
+
+        if not host_table.has_hosts:
+            return routes
+        hosts = host_table.lookup(host)
+        if not hosts:
+            return host_table.other_routes
+        # hosts and others never share an index
+        return [routes[index] for index in sorted(host_table.others + hosts)]
+
+    def match_cache_key(
+        self, scope: Scope, host: str = None
+    ) -> typing.Optional[typing.Tuple]:
+        state = self._match_cache_state
+        if state is None or state[0] != len(self.routes):
+            self.match_cache.clear()
+            cacheable = all(
+                isinstance(route, (Route, WebSocketRoute, Mount, Host))
+                for route in self.routes
+            )
+            with_host = any(isinstance(route, Host) for route in self.routes)
+            state = self._match_cache_state = (len(self.routes), cacheable, with_host)
+
+        if not state[1]:
+            return None
+        if state[2]:
+            if host is None:
+                host = get_host(scope)
+            return (scope["type"], scope.get("method"), scope["path"], host)
+        return (scope["type"], scope.get("method"), scope["path"])
 
     def url_path_for(self, name: str, **path_params) -> URLPath:
-        for route in self.routes:
-            try:
-                return route.url_path_for(name, **path_params)
-            except NoMatchFound:
-                pass
+        url = self.url_path_lookup(name, path_params)
+        if url is None:
+            raise NoMatchFound()
+        return url
+
+    def url_path_lookup(
+        self, name: str, path_params: typing.Dict[str, typing.Any]
+    ) -> typing.Optional[URLPath]:
+        if self._name_index is None or len(self._name_index) != len(self.routes):
+            self._name_index = RouteNameIndex(self.routes)
+        return self._name_index.lookup(name, path_params)
+
+    def has_slash_route(self, redirect_scope: Scope) -> bool:
+        if self._slash_table is None or len(self._slash_table) != len(self.routes):
+            self._slash_table = SlashRedirectTable(self.routes)
+
+        if redirect_scope["path"] in self._slash_table.statics:
+            return True
+
+        if not self._slash_table.parametric:
+            return False
 
-        raise NoMatchFound()
+        self.redirect_fallbacks += 1
+        for route in self._slash_table.parametric:
+            match, _ = route.matches(redirect_scope)
+            if match != Match.NONE:
+                return True
+        return False
+
+    def cache_match(
+        self,
+        cache_key: typing.Optional[typing.Tuple],
+        route: BaseRoute,
+        child_scope: Scope,
+    ) -> None:
+        if cache_key is None or not isinstance(route, (Route, WebSocketRoute)):
+            return
+        matched_params = {
+            _k: _v
+            for _k, _v in child_scope["path_params"].items()
+            if _k in route.param_convertors
+        }
+        self.match_cache.set(cache_key, (route, matched_params))
 
     @property
     def lifespan(self):
@@ -461,11 +1017,38 @@ class Router(object):
         if "router" not in scope:
             scope["router"] = self
 
+        cache_key = None
+        host = None
+        if scope["type"] != "lifespan" and self.host_table().has_hosts:
+            host = get_host(scope)
+        if self.match_cache is not None and scope["type"] != "lifespan":
+            cache_key = self.match_cache_key(scope, host)
+            cached = None if cache_key is None else self.match_cache.get(cache_key)
+            if cached is not None:
+                route, matched_params = cached
+                path_params = dict(scope.get("path_params", {}))
+                path_params.update(matched_params)
+                scope["endpoint"] = route.endpoint
+                scope["path_params"] = path_params
+                return route(scope)
+
         partial = None
+        mount_prefixes = self._mount_prefixes if scope["type"] != "lifespan" else None
+
+        for route in self.candidates(scope, host):
+            if mount_prefixes and id(route) in mount_prefixes:
+                prefix = mount_prefixes[id(route)]
+                path = scope["path"]
+                if path.startswith(prefix + "/"):
+                    scope["root_path"] = scope.get("root_path", "") + prefix
+                    scope["path"] = path[len(prefix) :]
+                    scope["endpoint"] = route.app
+                    return route.app(scope)
+                continue
 
-        for route in self.routes:
             match, child_scope = route.matches(scope)
             if match == Match.FULL:
+                self.cache_match(cache_key, route, child_scope)
                 scope.update(child_scope)
                 return route(scope)
             elif match == Match.PARTIAL and partial is None:
@@ -473,6 +1056,7 @@ class Router(object):
                 partial_scope = child_scope
 
         if partial is not None:
+            self.cache_match(cache_key, partial, partial_scope)
             scope.update(partial_scope)
             return partial(scope)
 
@@ -481,11 +1065,9 @@ class Router(object):
                 redirect_scope = dict(scope)
                 redirect_scope["path"] += "/"
 
-                for route in self.routes:
-                    match, child_scope = route.matches(redirect_scope)
-                    if match != Match.NONE:
-                        redirect_url = URL(scope=redirect_scope)
-                        return RedirectResponse(url=str(redirect_url))
+                if self.has_slash_route(redirect_scope):
+                    redirect_url = URL(scope=redirect_scope)
+                    return RedirectResponse(url=str(redirect_url))
 
         if self._lifespan is not None and scope["type"] == "lifespan":
             return self._lifespan(scope)
@@ -504,18 +1086,35 @@ class ProtocalRouter(object):
         return self.protocals[scope["type"]](scope)
 
 
-def req_res(func: typing.Callable):
+def req_res(
+    func: typing.Callable,
+    watch_disconnect: bool = False,
+    cancel_on_disconnect: bool = False,
+):
     is_coroutine = iscoroutinefunction(func)
+    watch_disconnect = watch_disconnect or cancel_on_disconnect
 
     def app(scope: Scope) -> ASGIInstance:
         async def awaitable(recv: Receive, send: Send) -> None:
             req = Request(scope, recv)
             # kwargs = scope.get("kwargs", {})
             if is_coroutine:
-                res = await func(req)
+                handler = func(req)
             else:
-                res = await run_in_threadpool(func, req)
+                handler = run_in_threadpool(func, req)
 
+            if watch_disconnect:
+                try:
+                    res = await req.watch_disconnect(
+                        handler, cancel=cancel_on_disconnect
+                    )
+                except ClientDisconnect:
+                    return
+            else:
+                res = await handler
+
+            if isinstance(res, (Response, PreparedResponse)):
+                res = res.for_scope(scope)
             await res(recv, send)
 
         return awaitable
@@ -534,24 +1133,25 @@ def ws_session(func: typing.Callable):
     return app
 
 
+def get_host(scope: Scope) -> str:
+    return scope_host(scope)
+
+
+def app_url_path_lookup(
+    app: ASGIApp, name: str, path_params: typing.Dict[str, typing.Any]
+) -> typing.Optional[URLPath]:
+    if isinstance(app, Router):
+        return app.url_path_lookup(name, path_params)
+
+    for route in getattr(app, "routes", None) or []:
+        url = route.url_path_lookup(name, path_params)
+        if url is not None:
+            return url
+    return None
+
+
 def get_name(endpoint: typing.Callable) -> str:
     if inspect.isfunction(endpoint) or inspect.isclass(endpoint):
         return endpoint.__name__
 
     return endpoint.__class__.__name__
-
-
-def replace_params(
-    path: str,
-    param_converts: typing.Dict[str, Convertor],
-    path_params: typing.Dict[str, str],
-) -> typing.Tuple[str, dict]:
-    for _k, _v in list(path_params.items()):
-        if "{" + _k + "}" in path:
-            convert = param_converts[_k]
-            _v = convert.to_string(_v)
-            path = path.replace("{" + _k + "}", _v)
-            path_params.pop(_k)
-        # end if
-    # end for
-    return path, path_params
@@ -8,18 +8,59 @@ author: emryslou@gmail.com
 """
 
 
+import argparse
+import asyncio
+import collections
 import functools
+import gzip
+import hashlib
 import os
+import posixpath
 import stat
+import time
 import typing
 from email.utils import parsedate
+from mimetypes import guess_type
 
 from aiofiles.os import stat as aio_stat
 
+from yast.concurrency import run_in_threadpool
 from yast.datastructures import Headers
-from yast.responses import FileResponse, PlainTextResponse, Response
+from yast.datastructures.scope import scope_headers
+from yast.responses import (
+    FileResponse,
+    PlainTextResponse,
+    PreparedResponse,
+    Response,
+)
 from yast.types import ASGIInstance, Receive, Scope, Send
 
+try:
+    import brotli
+except ImportError:  # pragma: nocover
+    brotli = None  # type: ignore
+
+NOT_FOUND = PreparedResponse(PlainTextResponse("Not Found", status_code=404))
+METHOD_NOT_ALLOWED = PreparedResponse(
+    PlainTextResponse("Method Not Allowed", status_code=405)
+)
+
+# full path, stat and headers when found
+ManifestEntry = typing.Tuple[
+    str, typing.Optional[os.stat_result], typing.Optional[typing.Dict[str, str]]
+]
+
+# encoding, full path, stat and manifest headers of a precompressed file
+Variant = typing.Tuple[str, str, os.stat_result, typing.Optional[typing.Dict[str, str]]]
+
+# request path, accepted encodings, fingerprinted
+CacheKey = typing.Tuple[str, typing.Tuple[str, ...], bool]
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# preferred first
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
 
 class NotModifiedResponse(Response):
     NOT_MODIFIED_HEADERS = (
@@ -42,18 +83,88 @@ class NotModifiedResponse(Response):
         )
 
 
+class CachedFile(object):
+    """file kept in memory by the `StaticFiles` hot cache"""
+
+    __slots__ = ("files", "size", "response", "headers", "checked_at")
+
+    def __init__(
+        self,
+        files: typing.List[typing.Tuple[str, os.stat_result]],
+        response: PreparedResponse,
+    ) -> None:
+        # every file the response was built from, with its (mtime, size)
+        self.files = [
+            (path, (stat_result.st_mtime, stat_result.st_size))
+            for path, stat_result in files
+        ]
+        self.size = len(response.body)
+        self.response = response
+        self.headers = Headers(raw=response.raw_headers)
+        self.checked_at = time.monotonic()
+
+    async def is_stale(self) -> bool:
+        for path, signature in self.files:
+            try:
+                stat_result = await aio_stat(path)
+            except FileNotFoundError:
+                return True
+            if (stat_result.st_mtime, stat_result.st_size) != signature:
+                return True
+        return False
+
+
 class StaticFiles(object):
+    """
+    `cache_max_file_size` enables the hot cache, files up to that size are
+    kept in memory with their headers, least recently used first out once
+    `cache_max_size` bytes are held, and revalidated by mtime every
+    `cache_revalidate` seconds.
+    `precompressed` serves `.br` / `.gz` sidecars written next to the files,
+    see `compress_directory`, to clients accepting those encodings.
+    `use_manifest` walks every directory once, on `startup` or the first
+    request, and looks files up in that index instead of stat-ing each
+    directory, changes are only seen after `rescan`, which `startup` runs
+    every `manifest_rescan` seconds when set.
+    `fingerprint` hashes the file contents on `startup`, then
+    `static_url("css/app.css")` gives `css/app.<hash>.css` which is served
+    as immutable, the plain path until the first scan.
+    """
+
     def __init__(
         self,
         *,
         directory: str = None,
         packages: typing.List[str] = None,
         check_dir: bool = True,
+        cache_max_file_size: int = 0,
+        cache_max_size: int = 16 * 1024 * 1024,
+        cache_revalidate: float = 1.0,
+        precompressed: bool = False,
+        use_manifest: bool = False,
+        manifest_rescan: float = None,
+        fingerprint: bool = False,
     ) -> None:
         self.directory = directory
         self.packages = packages
         self.all_directories = self.get_directories(directory, packages)
         self.config_checked = False
+        self.cache_max_file_size = cache_max_file_size
+        self.cache_max_size = cache_max_size
+        self.cache_revalidate = cache_revalidate
+        self.precompressed = precompressed
+        self.use_manifest = use_manifest
+        self.manifest_rescan = manifest_rescan
+        self.manifest = None  # type: typing.Optional[typing.Dict[str, ManifestEntry]]
+        self.rescan_task = None  # type: typing.Optional[asyncio.Future]
+        self.scan_lock = None  # type: typing.Optional[asyncio.Lock]
+        self.fingerprint = fingerprint
+        self.fingerprints = None  # type: typing.Optional[typing.Dict[str, str]]
+        self.fingerprinted = {}  # type: typing.Dict[str, str]
+        self.cache = (
+            collections.OrderedDict()
+        )  # type: typing.Dict[CacheKey, CachedFile]
+        self.cache_size = 0
 
         if directory is not None and check_dir:
             assert os.path.isdir(directory), f'Directory "{directory}" does not exists'
@@ -87,28 +198,149 @@ class StaticFiles(object):
         assert scope["type"] == "http"
 
         if scope["method"] not in ("GET", "HEAD"):
-            return PlainTextResponse("Method Not Allowed", status_code=405)
+            return METHOD_NOT_ALLOWED
 
         path = os.path.normpath(os.path.join(*scope["path"].split("/")))
         if path.startswith(".."):
-            return PlainTextResponse("Not Found", status_code=404)
+            return NOT_FOUND
         return functools.partial(self.asgi, scope=scope, path=path)
 
     async def asgi(self, receive: Receive, send: Send, scope: Scope, path: str) -> None:
         if not self.config_checked:
             await self.check_config()
             self.config_checked = True
+        if (self.use_manifest and self.manifest is None) or (
+            self.fingerprint and self.fingerprints is None
+        ):
+            await self.first_scan()
+
+        immutable = False
+        if self.fingerprint:
+            original = self.fingerprinted.get(path.replace(os.sep, "/"))
+            if original is not None:
+                path, immutable = os.path.normpath(original), True
+
+        try:
+            await self.serve(receive, send, scope, path, immutable)
+        except FileNotFoundError:
+            # deleted after the scan, nothing is sent before the file is opened
+            if not self.drop_missing(path):
+                raise
+            await self.serve(receive, send, scope, path, immutable)
 
+    async def serve(
+        self, receive: Receive, send: Send, scope: Scope, path: str, immutable: bool
+    ) -> None:
         method = scope["method"]
-        headers = Headers(scope=scope)
-        res = await self.get_response(path, method, headers)
+        headers = scope_headers(scope)
+        if self.cache_max_file_size and "range" not in headers:
+            res = await self.get_cached_response(path, method, headers, immutable)
+        else:
+            res = await self.get_response(path, method, headers, immutable)
+        res = res.for_scope(scope)
 
         await res(receive, send)
 
-    async def get_response(
-        self, path: str, method: str, request_headers: Headers
-    ) -> Response:
-        stat_result = None
+    def drop_missing(self, path: str) -> bool:
+        if self.manifest is None:
+            return False
+        dropped = False
+        for suffix in ("",) + tuple(PRECOMPRESSED_SUFFIXES.values()):
+            full_path = self.manifest.get(path + suffix, ("", None, None))[0]
+            if full_path and not os.path.exists(full_path):
+                del self.manifest[path + suffix]
+                dropped = True
+        return dropped
+
+    def build_manifest(self) -> typing.Dict[str, ManifestEntry]:
+        manifest = {}  # type: typing.Dict[str, ManifestEntry]
+        for directory in self.all_directories:
+            for dirpath, _, filenames in os.walk(directory, followlinks=True):
+                for filename in filenames:
+                    full_path = os.path.join(dirpath, filename)
+                    path = os.path.relpath(full_path, directory)
+                    if path in manifest:
+                        continue  # the first directory wins
+                    try:
+                        stat_result = os.stat(full_path)
+                    except FileNotFoundError:  # pragma: nocover
+                        continue
+                    if stat.S_ISREG(stat_result.st_mode):
+                        res = FileResponse(full_path, stat_result=stat_result)
+                        manifest[path] = (full_path, stat_result, dict(res.headers))
+        return manifest
+
+    def build_fingerprints(self) -> typing.Dict[str, str]:
+        fingerprints = {}  # type: typing.Dict[str, str]
+        for directory in self.all_directories:
+            for dirpath, _, filenames in os.walk(directory, followlinks=True):
+                for filename in filenames:
+                    base, suffix = os.path.splitext(filename)
+                    if suffix in (".br", ".gz") and base in filenames:
+                        continue  # sidecars follow their source
+                    full_path = os.path.join(dirpath, filename)
+                    path = os.path.relpath(full_path, directory).replace(os.sep, "/")
+                    if path in fingerprints:
+                        continue
+                    digest = hashlib.md5()
+                    with open(full_path, "rb") as file:
+                        for chunk in iter(functools.partial(file.read, 65536), b""):
+                            digest.update(chunk)
+                    name, ext = posixpath.splitext(path)
+                    fingerprints[path] = f"{name}.{digest.hexdigest()[:12]}{ext}"
+        return fingerprints
+
+    def set_fingerprints(self, fingerprints: typing.Dict[str, str]) -> None:
+        self.fingerprints = fingerprints
+        self.fingerprinted = {value: key for key, value in fingerprints.items()}
+
+    def static_url(self, path: str) -> str:
+        """
+        fingerprinted path of `path` with `fingerprint`, used by
+        `url_for(<mount name>, path=...)`, unknown paths are left as they are
+        """
+        if not self.fingerprints:
+            return path  # not scanned yet, hashing here would block the event loop
+        return self.fingerprints.get(path, path)
+
+    async def first_scan(self) -> None:
+        # concurrent first requests wait for a single scan
+        if self.scan_lock is None:
+            self.scan_lock = asyncio.Lock()
+        async with self.scan_lock:
+            if (self.use_manifest and self.manifest is None) or (
+                self.fingerprint and self.fingerprints is None
+            ):
+                await self.rescan()
+
+    async def rescan(self) -> None:
+        if self.use_manifest:
+            self.manifest = await run_in_threadpool(self.build_manifest)
+        if self.fingerprint:
+            self.set_fingerprints(await run_in_threadpool(self.build_fingerprints))
+
+    async def rescan_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.manifest_rescan)
+            await self.rescan()
+
+    async def startup(self) -> None:
+        if not (self.use_manifest or self.fingerprint):
+            return
+        await self.rescan()
+        if self.manifest_rescan and self.rescan_task is None:
+            self.rescan_task = asyncio.ensure_future(self.rescan_periodically())
+
+    async def shutdown(self) -> None:
+        if self.rescan_task is not None:
+            self.rescan_task.cancel()
+            self.rescan_task = None
+
+    async def find_file(self, path: str) -> ManifestEntry:
+        if self.manifest is not None:
+            return self.manifest.get(path, ("", None, None))
+
+        full_path = ""
         for directory in self.all_directories:
             full_path = os.path.join(directory, path)
             try:
@@ -116,17 +348,181 @@ class StaticFiles(object):
             except FileNotFoundError:
                 pass
             else:
+                if stat.S_ISREG(stat_result.st_mode):
+                    return full_path, stat_result, None
                 break
+        return full_path, None, None
 
-        if stat_result is None or not os.path.isfile(full_path):
-            return PlainTextResponse("Not Found", status_code=404)
+    async def find_variant(
+        self,
+        path: str,
+        full_path: str,
+        stat_result: os.stat_result,
+        encodings: typing.Tuple[str, ...],
+    ) -> typing.Optional[Variant]:
+        for encoding in encodings:
+            variant_path = full_path + PRECOMPRESSED_SUFFIXES[encoding]
+            variant_headers = None
+            if self.manifest is not None:
+                variant_path, variant_stat, variant_headers = self.manifest.get(
+                    path + PRECOMPRESSED_SUFFIXES[encoding], ("", None, None)
+                )
+                if variant_stat is None:
+                    continue
+            else:
+                try:
+                    variant_stat = await aio_stat(variant_path)
+                except FileNotFoundError:
+                    continue
+            # sidecars older than their source are outdated
+            if (
+                stat.S_ISREG(variant_stat.st_mode)
+                and variant_stat.st_mtime >= stat_result.st_mtime
+            ):
+                return encoding, variant_path, variant_stat, variant_headers
+        return None
 
-        res = FileResponse(full_path, stat_result=stat_result, method=method)
+    def accepted_encodings(self, request_headers: Headers) -> typing.Tuple[str, ...]:
+        accept_encoding = request_headers.get("accept-encoding")
+        if not self.precompressed or not accept_encoding:
+            return ()
+        accepted = set()
+        for item in accept_encoding.lower().split(","):
+            name, _, params = item.partition(";")
+            _, _, qvalue = params.partition("q=")
+            try:
+                if qvalue and float(qvalue) <= 0:
+                    continue
+            except ValueError:
+                continue
+            accepted.add(name.strip())
+        return tuple(
+            encoding
+            for encoding in PRECOMPRESSED_SUFFIXES
+            if encoding in accepted or "*" in accepted
+        )
+
+    def file_response(
+        self,
+        full_path: str,
+        stat_result: os.stat_result,
+        method: str,
+        variant: typing.Optional[Variant] = None,
+        headers: typing.Optional[typing.Dict[str, str]] = None,
+        immutable: bool = False,
+    ) -> FileResponse:
+        if variant is None:
+            res = FileResponse(
+                full_path, headers=headers, stat_result=stat_result, method=method
+            )
+        else:
+            encoding, variant_path, variant_stat, variant_headers = variant
+            if variant_headers is None:
+                variant_headers = FileResponse.get_stat_headers(variant_stat)
+            res = FileResponse(
+                variant_path,
+                headers={
+                    "content-encoding": encoding,
+                    "content-length": variant_headers["content-length"],
+                    "last-modified": variant_headers["last-modified"],
+                    "etag": f"{variant_headers['etag']}-{encoding}",
+                },
+                media_type=guess_type(full_path)[0] or "text/plain",
+                stat_result=variant_stat,
+                method=method,
+            )
+        if self.precompressed:
+            res.headers.add_vary_header("accept-encoding")
+        if immutable:
+            res.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+        return res
+
+    async def get_response(
+        self, path: str, method: str, request_headers: Headers, immutable: bool = False
+    ) -> typing.Union[Response, PreparedResponse]:
+        full_path, stat_result, headers = await self.find_file(path)
+        if stat_result is None:
+            return NOT_FOUND
+
+        encodings = self.accepted_encodings(request_headers)
+        variant = await self.find_variant(path, full_path, stat_result, encodings)
+        res = self.file_response(
+            full_path, stat_result, method, variant, headers, immutable
+        )
         if self.is_not_modified(res.headers, request_headers):
             return NotModifiedResponse(res.headers)
 
         return res
 
+    async def get_cached_response(
+        self, path: str, method: str, request_headers: Headers, immutable: bool = False
+    ) -> typing.Union[Response, PreparedResponse]:
+        encodings = self.accepted_encodings(request_headers)
+        key = (path, encodings, immutable)
+        cached = self.cache.get(key)
+        if cached is not None:
+            now = time.monotonic()
+            if now - cached.checked_at >= self.cache_revalidate:
+                if await cached.is_stale():
+                    self.evict(key)
+                    cached = None
+                else:
+                    cached.checked_at = now
+
+        if cached is None:
+            full_path, stat_result, headers = await self.find_file(path)
+            if stat_result is None:
+                return NOT_FOUND
+            variant = await self.find_variant(path, full_path, stat_result, encodings)
+            res = self.file_response(
+                full_path, stat_result, method, variant, headers, immutable
+            )
+            files = [(full_path, stat_result)]
+            if variant is not None:
+                files.append((variant[1], variant[2]))
+            if res.stat_result.st_size <= self.cache_max_file_size:
+                cached = await self.load(key, res, files)
+        else:
+            self.cache.move_to_end(key)
+
+        if cached is not None:
+            res, headers = cached.response, cached.headers
+        else:
+            headers = res.headers
+        if self.is_not_modified(headers, request_headers):
+            return NotModifiedResponse(headers)
+        return res
+
+    async def load(
+        self,
+        key: CacheKey,
+        res: FileResponse,
+        files: typing.List[typing.Tuple[str, os.stat_result]],
+    ) -> typing.Optional[CachedFile]:
+        body = await run_in_threadpool(self.read_file, res.path)
+        if len(body) != res.stat_result.st_size:
+            return None  # changed while reading
+        response = PreparedResponse(Response(body, headers=dict(res.headers)))
+        cached = CachedFile(files, response)
+
+        self.evict(key)
+        if cached.size <= self.cache_max_size:
+            while self.cache and self.cache_size + cached.size > self.cache_max_size:
+                self.evict(next(iter(self.cache)))
+            self.cache[key] = cached
+            self.cache_size += cached.size
+        return cached
+
+    def evict(self, key: CacheKey) -> None:
+        cached = self.cache.pop(key, None)
+        if cached is not None:
+            self.cache_size -= cached.size
+
+    @staticmethod
+    def read_file(full_path: str) -> bytes:
+        with open(full_path, "rb") as file:
+            return file.read()
+
     def is_not_modified(
         self, response_headers: Headers, request_headers: Headers
     ) -> bool:
@@ -167,3 +563,70 @@ class StaticFiles(object):
             raise RuntimeWarning(
                 f"StaticFile directory `{self.directory}` is not a directory"
             )
+
+
+def compress_directory(
+    directory: str,
+    encodings: typing.Sequence[str] = ("br", "gzip"),
+    minimum_size: int = 256,
+    force: bool = False,
+) -> typing.List[str]:
+    """
+    write the missing or outdated `.br` / `.gz` sidecars for the files of
+    `directory`, skipping small files and files that do not get smaller,
+    `br` needs `brotli` installed, returns the written paths
+    """
+    written = []
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if guess_type(filename)[1] is not None:
+                continue  # already compressed, sidecars included
+            path = os.path.join(dirpath, filename)
+            stat_result = os.stat(path)
+            if stat_result.st_size < minimum_size:
+                continue
+
+            body = None
+            for encoding in encodings:
+                if encoding == "br" and brotli is None:
+                    continue
+                variant_path = path + PRECOMPRESSED_SUFFIXES[encoding]
+                if (
+                    not force
+                    and os.path.exists(variant_path)
+                    and os.stat(variant_path).st_mtime >= stat_result.st_mtime
+                ):
+                    continue
+                if body is None:
+                    with open(path, "rb") as file:
+                        body = file.read()
+                if encoding == "br":
+                    compressed = brotli.compress(body)
+                else:
+                    compressed = gzip.compress(body, mtime=0)
+                if len(compressed) >= len(body):
+                    continue
+                with open(variant_path, "wb") as file:
+                    file.write(compressed)
+                written.append(variant_path)
+    return written
+
+
+def main(args: typing.List[str] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m yast.staticfiles",
+        description="pre-generate compressed sidecars for StaticFiles",
+    )
+    parser.add_argument("directory", nargs="+")
+    parser.add_argument("--minimum-size", type=int, default=256)
+    parser.add_argument("--force", action="store_true")
+    options = parser.parse_args(args)
+    for directory in options.directory:
+        for path in compress_directory(
+            directory, minimum_size=options.minimum_size, force=options.force
+        ):
+            print(path)
+
+
+if __name__ == "__main__":  # pragma: nocover
+    main()
@@ -156,6 +156,7 @@ class _ASGIAdapter(requests.adapters.HTTPAdapter):
                     (key.decode(), value.decode()) for key, value in message["headers"]
                 ]
                 raw_kwargs["preload_content"] = False
+                raw_kwargs["request_method"] = request.method
                 raw_kwargs["original_response"] = _MockOriginalResponse(
                     raw_kwargs["headers"]
                 )
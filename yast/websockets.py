@@ -1,7 +1,7 @@
 import enum
-import json
 import typing
 
+from yast.config import get_json_codec
 from yast.requests import HttpConnection
 from yast.types import Message, Receive, Scope, Send
 
@@ -91,7 +91,7 @@ class WebSocket(HttpConnection):
 
     async def receive_json(self) -> typing.Any:
         json_bytes = await self.receive_bytes()
-        return json.loads(json_bytes.decode("utf-8"))
+        return get_json_codec().loads(json_bytes)
 
     async def send_text(self, data: str) -> None:
         await self.send({"type": "websocket.send", "text": data})
@@ -100,8 +100,8 @@ class WebSocket(HttpConnection):
         await self.send({"type": "websocket.send", "bytes": data})
 
     async def send_json(self, data) -> None:
-        _j = json.dumps(data).encode("utf-8")
-        await self.send({"type": "websocket.send", "bytes": _j})
+        data = get_json_codec().dumps(data)
+        await self.send({"type": "websocket.send", "bytes": data})
 
     async def close(self, code=1000) -> None:
         await self.send({"type": "websocket.close", "code": code})